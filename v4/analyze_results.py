@@ -1,14 +1,155 @@
 # analyze_results.py
 import pandas as pd
+import numpy as np
 import sys
 import os
 import re
+import argparse
+from glob import glob
+from math import comb
+from scipy import stats
+from scipy.optimize import curve_fit
 
-def generate_statistics(input_csv_path, output_report_path=None):
+NUMERIC_COLS = [
+    'server_replicas', 'num_concurrent_clients_scenario', 'num_messages_per_client_scenario',
+    'total_connections_attempted', 'successful_connections', 'total_messages_sent',
+    'total_messages_received', 'average_latency_ms', 'max_latency_ms', 'min_latency_ms',
+    'total_errors', 'scenario_success_rate'
+]
+SCENARIO_COLS = ['server_replicas', 'num_concurrent_clients_scenario', 'num_messages_per_client_scenario']
+GROUP_COLS = ['language'] + SCENARIO_COLS
+
+# Parâmetros do bootstrap usado no relatório agregado
+BOOTSTRAP_RESAMPLES = 2000
+CONFIDENCE_LEVEL = 0.95
+
+# Parâmetros padrão do modo de comparação (baseline vs. candidato)
+REGRESSION_THRESHOLD_PCT = 5.0
+SUCCESS_THRESHOLD_PP = 0.5
+SIGNIFICANCE_ALPHA = 0.05
+REGRESSION_EXIT_CODE = 2
+
+# SLO padrão do relatório de capacidade
+SLO_LATENCY_MS = 2.0
+SLO_SUCCESS_PCT = 99.9
+SLO_QUANTILE = 0.99
+SLO_LATENCY_METRIC = 'average_latency_ms'
+# Distância mínima (eixos normalizados em [0, 1]) entre a corda e a curva para haver joelho,
+# como a sensibilidade do Kneedle: abaixo disso a curva é tratada como praticamente linear
+KNEE_MIN_DISTANCE = 0.1
+# Folga para considerar que um coeficiente do ajuste USL/Amdahl terminou no limite do curve_fit
+BOUND_TOLERANCE = 1e-6
+
+def clean_results(df):
+    """
+    Normaliza um DataFrame de resultados: remove a coluna 'language' duplicada
+    gerada pelo combine_csvs e garante que as colunas numéricas têm o tipo correto.
+    """
+    df = df.drop(columns=[c for c in df.columns if re.fullmatch(r'language\.\d+', c)])
+    for col in NUMERIC_COLS + ['run_number']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    df = df.dropna(subset=[c for c in NUMERIC_COLS if c in df.columns])
+    return df
+
+def load_results(path, exclude_client_saturated=False):
+    """
+    Carrega resultados de um CSV único ou de um diretório de logs.
+    Para um diretório, concatena todos os 'run_*/results_combined.csv' (ou o
+    'results_combined.csv' do próprio diretório, se não houver subdiretórios de execução).
+    Com `exclude_client_saturated`, descarta cenários em que o gerador de carga saturou.
+    """
+    if os.path.isdir(path):
+        csv_files = sorted(glob(os.path.join(path, 'run_*', 'results_combined.csv')))
+        if not csv_files and os.path.exists(os.path.join(path, 'results_combined.csv')):
+            csv_files = [os.path.join(path, 'results_combined.csv')]
+    elif os.path.exists(path):
+        csv_files = [path]
+    else:
+        csv_files = []
+
+    if not csv_files:
+        print(f"Erro: Nenhum arquivo de resultados encontrado em {path}", file=sys.stderr)
+        sys.exit(1)
+
+    df_list = []
+    for csv_file in csv_files:
+        try:
+            df_list.append(pd.read_csv(csv_file))
+        except pd.errors.EmptyDataError:
+            print(f"Aviso: O arquivo {csv_file} está vazio. Ignorando.", file=sys.stderr)
+    if not df_list:
+        return pd.DataFrame()
+
+    df = clean_results(pd.concat(df_list, ignore_index=True))
+    if exclude_client_saturated:
+        df = drop_client_saturated(df)
+    return df
+
+def client_saturated_mask(df):
+    """Cenários marcados pelo client.py como limitados pelo próprio gerador de carga."""
+    if 'client_saturated' not in df.columns:
+        return pd.Series(False, index=df.index)
+    return df['client_saturated'].astype(str).str.lower().isin(['true', '1'])
+
+def drop_client_saturated(df):
+    mask = client_saturated_mask(df)
+    if mask.any():
+        print(f"Aviso: {mask.sum()} cenário(s) com gerador de carga saturado excluído(s) da análise.", file=sys.stderr)
+    return df[~mask]
+
+def client_saturation_section(df):
+    """Linhas de relatório anotando os cenários em que o cliente, e não o servidor, limitou o resultado."""
+    mask = client_saturated_mask(df)
+    if not mask.any():
+        return []
+    cols = [c for c in ['run_number'] + GROUP_COLS + ['client_loop_lag_p99_ms', 'client_cpu_pct', 'client_scheduling_delay_p99_ms'] if c in df.columns]
+    lines = [f"ATENÇÃO: {mask.sum()} cenário(s) com gerador de carga saturado (resultado possivelmente limitado pelo cliente).",
+             "Use --exclude-client-saturated para removê-los da análise.\n"]
+    lines.append(df.loc[mask, cols].round(3).to_string(index=False))
+    lines.append("\n" + "="*80 + "\n")
+    return lines
+
+def bootstrap_mean_ci(samples, n_resamples=BOOTSTRAP_RESAMPLES, confidence=CONFIDENCE_LEVEL, seed=0):
+    """
+    Calcula intervalos de confiança bootstrap (percentil) da média para vários grupos de uma vez.
+
+    `samples` é um dicionário {chave: array de observações}. Os grupos são reunidos
+    por tamanho em uma matriz (grupos x n) e, para cada tamanho, é sorteada uma única
+    matriz de contagens multinomiais (n x reamostragens). As médias reamostradas de
+    todos os grupos saem de um só produto matricial, sem laço Python por reamostragem.
+
+    Retorna {chave: (média, limite_inferior, limite_superior, médias_bootstrap)}.
+    """
+    rng = np.random.default_rng(seed)
+    alpha = (1 - confidence) / 2
+    results = {}
+
+    by_size = {}
+    for key, values in samples.items():
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            continue
+        by_size.setdefault(len(values), []).append((key, values))
+
+    for n, groups in by_size.items():
+        keys = [k for k, _ in groups]
+        matrix = np.vstack([v for _, v in groups])
+        counts = rng.multinomial(n, np.full(n, 1.0 / n), size=n_resamples).T
+        boot_means = matrix @ counts / n
+        lows, highs = np.quantile(boot_means, [alpha, 1 - alpha], axis=1)
+        point = matrix.mean(axis=1)
+        for i, key in enumerate(keys):
+            results[key] = (point[i], lows[i], highs[i], boot_means[i])
+
+    return results
+
+def generate_statistics(input_csv_path, output_report_path=None, exclude_client_saturated=False):
     if not os.path.exists(input_csv_path):
         print(f"Erro: Arquivo CSV não encontrado em {input_csv_path}", file=sys.stderr)
         sys.exit(1)
-    
+
     # Extrai o número da execução do caminho do arquivo para usar no título
     run_number = 0
     run_match = re.search(r'run_(\d+)', input_csv_path)
@@ -20,22 +161,15 @@ def generate_statistics(input_csv_path, output_report_path=None):
     except pd.errors.EmptyDataError:
         print(f"Aviso: O arquivo {input_csv_path} está vazio. Nenhuma estatística para gerar.", file=sys.stderr)
         return
-    
+
     if df.empty:
         print("O DataFrame está vazio. Nenhuma estatística para gerar.", file=sys.stderr)
         return
 
     # Garante que as colunas numéricas estão com o tipo correto
-    numeric_cols = [
-        'server_replicas', 'num_concurrent_clients_scenario', 'num_messages_per_client_scenario',
-        'total_connections_attempted', 'successful_connections', 'total_messages_sent',
-        'total_messages_received', 'average_latency_ms', 'max_latency_ms', 'min_latency_ms',
-        'total_errors', 'scenario_success_rate'
-    ]
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    df.dropna(subset=numeric_cols, inplace=True)
+    df = clean_results(df)
+    if exclude_client_saturated:
+        df = drop_client_saturated(df)
 
     if df.empty:
         print("O DataFrame está vazio após a limpeza. Nenhuma estatística para gerar.", file=sys.stderr)
@@ -44,10 +178,10 @@ def generate_statistics(input_csv_path, output_report_path=None):
     report_lines = []
     report_lines.append(f"--- Relatório de Estatísticas da Execução: {run_number} ---")
     report_lines.append(f"Dados analisados de: {os.path.basename(input_csv_path)}\n")
+    report_lines.extend(client_saturation_section(df))
 
-    group_cols = ['language', 'server_replicas', 'num_concurrent_clients_scenario', 'num_messages_per_client_scenario']
     metrics_of_interest = ['average_latency_ms', 'scenario_success_rate', 'total_messages_received']
-    
+
     # Filtra apenas as métricas que realmente existem no DataFrame
     metrics_of_interest = [m for m in metrics_of_interest if m in df.columns]
 
@@ -56,7 +190,7 @@ def generate_statistics(input_csv_path, output_report_path=None):
         return
 
     # Estatísticas por cenário detalhado
-    grouped_stats = df.groupby(group_cols)[metrics_of_interest].describe(percentiles=[.50, .95]).round(2)
+    grouped_stats = df.groupby(GROUP_COLS)[metrics_of_interest].describe(percentiles=[.50, .95]).round(2)
     report_lines.append("Estatísticas por Cenário (Linguagem, Servidores, Clientes, Mensagens):\n")
     report_lines.append(grouped_stats.to_string())
     report_lines.append("\n" + "="*80 + "\n")
@@ -68,18 +202,563 @@ def generate_statistics(input_csv_path, output_report_path=None):
         report_lines.append(lang_stats.to_string())
         report_lines.append("\n" + "="*80 + "\n")
 
-    # Salva ou imprime o relatório
+    write_report(report_lines, output_report_path, f"Relatório da execução {run_number}")
+
+def write_report(report_lines, output_report_path, label):
+    """Salva o relatório em arquivo ou o imprime na saída padrão."""
     report_content = "\n".join(report_lines)
     if output_report_path:
         with open(output_report_path, 'w') as f:
             f.write(report_content)
-        print(f"Relatório da execução {run_number} salvo em: {output_report_path}")
+        print(f"{label} salvo em: {output_report_path}")
     else:
         print(report_content)
 
+def _ci_table(df, keys, metric):
+    """
+    Monta uma tabela com média, IC bootstrap e variação execução-a-execução
+    de `metric` para cada grupo definido por `keys`.
+    """
+    samples = {k: g.sort_values('run_number')[metric].to_numpy() for k, g in df.groupby(keys)}
+    ci = bootstrap_mean_ci(samples)
+    rows = []
+    for key, values in samples.items():
+        if key not in ci:
+            continue
+        mean, low, high, _ = ci[key]
+        std = np.std(values, ddof=1) if len(values) > 1 else 0.0
+        key = key if isinstance(key, tuple) else (key,)
+        rows.append(dict(zip(keys, key), n_runs=len(values), mean=mean, ci_low=low, ci_high=high,
+                         run_std=std, run_cv_pct=(std / mean * 100) if mean else np.nan))
+    return pd.DataFrame(rows).set_index(keys).round(3), ci
+
+def generate_aggregated_statistics(base_dir, output_report_path=None, exclude_client_saturated=False):
+    """
+    Gera o relatório consolidado de todas as execuções ('run_*') de um diretório de logs,
+    com intervalos de confiança bootstrap por cenário e por linguagem e a variância
+    entre execuções.
+    """
+    df = load_results(base_dir, exclude_client_saturated)
+    if df.empty or 'run_number' not in df.columns:
+        print("O DataFrame está vazio após a limpeza. Nenhuma estatística para gerar.", file=sys.stderr)
+        return
+
+    n_runs = df['run_number'].nunique()
+    confidence_pct = int(CONFIDENCE_LEVEL * 100)
+    report_lines = []
+    report_lines.append(f"--- Relatório Agregado de {n_runs} Execuções ---")
+    report_lines.append(f"Dados analisados de: {base_dir} ({len(df)} cenários, contando todas as execuções)")
+    report_lines.append(f"IC: bootstrap percentil de {confidence_pct}% da média, {BOOTSTRAP_RESAMPLES} reamostragens sobre as execuções.\n")
+    report_lines.extend(client_saturation_section(df))
+
+    metrics_of_interest = [m for m in ['average_latency_ms', 'scenario_success_rate'] if m in df.columns]
+    scenario_ci = {}
+    for metric in metrics_of_interest:
+        table, scenario_ci[metric] = _ci_table(df, GROUP_COLS, metric)
+        report_lines.append(f"Estimativas por Cenário - {metric} (Linguagem, Servidores, Clientes, Mensagens):\n")
+        report_lines.append(table.to_string())
+        report_lines.append("\n" + "="*80 + "\n")
+
+    # Por linguagem, a unidade amostral é a média de cada execução sobre todos os cenários
+    run_means = df.groupby(['language', 'run_number'])[metrics_of_interest].mean().reset_index()
+    for metric in metrics_of_interest:
+        table, _ = _ci_table(run_means, ['language'], metric)
+        scenario_cv = df.groupby(GROUP_COLS)[metric].agg(lambda x: x.std(ddof=1) / x.mean() * 100 if x.mean() else np.nan)
+        table['mean_scenario_cv_pct'] = scenario_cv.groupby('language').mean().round(3)
+        report_lines.append(f"Estimativas Gerais por Linguagem - {metric} (média por execução):\n")
+        report_lines.append(table.to_string())
+        report_lines.append("\n" + "="*80 + "\n")
+
+    # Diferença entre linguagens por cenário: IC bootstrap da diferença de médias.
+    # Grupos do mesmo tamanho compartilham a matriz de contagens e as amostras são
+    # ordenadas por execução, então a diferença é um bootstrap pareado por execução.
+    languages = sorted(df['language'].unique())
+    if len(languages) == 2 and 'average_latency_ms' in scenario_ci:
+        lang_a, lang_b = languages
+        ci = scenario_ci['average_latency_ms']
+        rows = []
+        for scenario, _ in df.groupby(SCENARIO_COLS):
+            key_a, key_b = (lang_a,) + scenario, (lang_b,) + scenario
+            if key_a not in ci or key_b not in ci:
+                continue
+            diff = ci[key_a][3] - ci[key_b][3]
+            low, high = np.quantile(diff, [(1 - CONFIDENCE_LEVEL) / 2, (1 + CONFIDENCE_LEVEL) / 2])
+            if high < 0:
+                verdict = f"{lang_a} mais rápido"
+            elif low > 0:
+                verdict = f"{lang_b} mais rápido"
+            else:
+                verdict = "inconclusivo"
+            rows.append(dict(zip(SCENARIO_COLS, scenario), diff_ms=ci[key_a][0] - ci[key_b][0],
+                             ci_low=low, ci_high=high, resultado=verdict))
+        if rows:
+            diff_table = pd.DataFrame(rows).set_index(SCENARIO_COLS).round(3)
+            report_lines.append(f"Diferença de Latência Média por Cenário ({lang_a} - {lang_b}, ms):\n")
+            report_lines.append(diff_table.to_string())
+            report_lines.append("\nResumo: " + ", ".join(f"{v}: {c}" for v, c in diff_table['resultado'].value_counts().items()))
+            report_lines.append("\n" + "="*80 + "\n")
+
+    write_report(report_lines, output_report_path, "Relatório agregado")
+
+def benjamini_hochberg(p_values):
+    """Ajusta p-valores para comparações múltiplas (Benjamini-Hochberg). NaN é preservado."""
+    p_values = np.asarray(p_values, dtype=float)
+    adjusted = np.full_like(p_values, np.nan)
+    valid = ~np.isnan(p_values)
+    p = p_values[valid]
+    if len(p) == 0:
+        return adjusted
+    order = np.argsort(p)
+    ranked = p[order] * len(p) / np.arange(1, len(p) + 1)
+    ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+    out = np.empty_like(p)
+    out[order] = np.minimum(ranked, 1.0)
+    adjusted[valid] = out
+    return adjusted
+
+def min_mannwhitney_p(n_base, n_cand):
+    """Menor p-valor bilateral que o teste exato de Mann-Whitney consegue produzir com essas amostras."""
+    return min(2 / comb(n_base + n_cand, n_base), 1.0)
+
+def runs_needed(level):
+    """Menor número de execuções por lado com que o Mann-Whitney consegue p < `level`."""
+    n = 2
+    while min_mannwhitney_p(n, n) >= level:
+        n += 1
+    return n
+
+def _compare_scenario(base, cand):
+    """
+    Compara um cenário entre baseline e candidato.
+    Latência: Mann-Whitney U sobre as execuções, com delta de Cliff como tamanho de efeito. Com
+    uma única execução de algum lado não há teste ('lat_test' = 'inconclusivo').
+    Taxa de sucesso: teste z de duas proporções sobre o total de mensagens enviadas/recebidas.
+    """
+    base_lat = base['average_latency_ms'].to_numpy()
+    cand_lat = cand['average_latency_ms'].to_numpy()
+    base_mean, cand_mean = base_lat.mean(), cand_lat.mean()
+    row = {
+        'n_base': len(base_lat), 'n_cand': len(cand_lat),
+        'lat_base_ms': base_mean, 'lat_cand_ms': cand_mean,
+        'lat_change_pct': (cand_mean - base_mean) / base_mean * 100 if base_mean else np.nan,
+        'lat_cliffs_delta': np.nan, 'lat_p': np.nan, 'lat_test': 'inconclusivo',
+    }
+    if len(base_lat) and len(cand_lat):
+        u_stat, p_value = stats.mannwhitneyu(cand_lat, base_lat, alternative='two-sided')
+        row['lat_cliffs_delta'] = 2 * u_stat / (len(cand_lat) * len(base_lat)) - 1
+        if len(base_lat) > 1 and len(cand_lat) > 1:
+            row['lat_p'], row['lat_test'] = p_value, 'mann-whitney'
+
+    sent_b, recv_b = base['total_messages_sent'].sum(), base['total_messages_received'].sum()
+    sent_c, recv_c = cand['total_messages_sent'].sum(), cand['total_messages_received'].sum()
+    rate_b = recv_b / sent_b if sent_b else np.nan
+    rate_c = recv_c / sent_c if sent_c else np.nan
+    row['success_base_pct'] = rate_b * 100
+    row['success_cand_pct'] = rate_c * 100
+    row['success_change_pp'] = (rate_c - rate_b) * 100
+    row['success_p'] = np.nan
+    if sent_b and sent_c:
+        pooled = (recv_b + recv_c) / (sent_b + sent_c)
+        se = np.sqrt(pooled * (1 - pooled) * (1 / sent_b + 1 / sent_c))
+        row['success_p'] = 2 * stats.norm.sf(abs(rate_c - rate_b) / se) if se > 0 else 1.0
+    return row
+
+def compare_results(baseline_path, candidate_path, output_report_path=None,
+                    threshold_pct=REGRESSION_THRESHOLD_PCT, success_threshold_pp=SUCCESS_THRESHOLD_PP,
+                    alpha=SIGNIFICANCE_ALPHA, exclude_client_saturated=False):
+    """
+    Compara dois conjuntos de resultados (diretórios de logs ou CSVs) cenário a cenário,
+    casando por (linguagem, servidores, clientes, mensagens).
+
+    Um cenário é regressão quando a mudança é estatisticamente significativa (p ajustado
+    por Benjamini-Hochberg < alpha) e maior que o limiar: latência pior em mais de
+    `threshold_pct` % ou taxa de sucesso menor em mais de `success_threshold_pp` pontos percentuais.
+    Com m cenários testados, o nível mais exigente do BH é alpha/m; cenários cujo número de
+    execuções não permite ao Mann-Whitney um p abaixo dele (ex: 5 contra 5 com 600 cenários), ou
+    sem teste, saem da correção e, com mudança de latência acima do limiar, são marcados como
+    'inconclusivo', sem contar como regressão.
+
+    Retorna o número de regressões encontradas.
+    """
+    base_df = load_results(baseline_path, exclude_client_saturated)
+    cand_df = load_results(candidate_path, exclude_client_saturated)
+    if base_df.empty or cand_df.empty:
+        print("Erro: Um dos conjuntos de resultados está vazio. Nada para comparar.", file=sys.stderr)
+        sys.exit(1)
+
+    cand_groups = dict(list(cand_df.groupby(GROUP_COLS)))
+    rows = []
+    for key, base in base_df.groupby(GROUP_COLS):
+        if key not in cand_groups:
+            continue
+        rows.append(dict(zip(GROUP_COLS, key), **_compare_scenario(base, cand_groups[key])))
+
+    if not rows:
+        print("Erro: Nenhum cenário em comum entre baseline e candidato.", file=sys.stderr)
+        sys.exit(1)
+
+    comparison = pd.DataFrame(rows)
+    # A exclusão depende só do número de execuções, não dos dados, então não enviesa a correção
+    corrected_alpha = alpha / len(comparison)
+    reachable = pd.Series([min_mannwhitney_p(b, c) < corrected_alpha
+                           for b, c in zip(comparison['n_base'], comparison['n_cand'])], index=comparison.index)
+    underpowered = comparison['lat_p'].notna() & ~reachable
+    comparison.loc[underpowered, 'lat_test'] = 'inconclusivo'
+    comparison['lat_p_adj'] = benjamini_hochberg(comparison['lat_p'].where(reachable))
+    comparison['success_p_adj'] = benjamini_hochberg(comparison['success_p'])
+
+    def significant(p_adj):
+        return p_adj.notna() & (p_adj < alpha)
+
+    lat_regression = significant(comparison['lat_p_adj']) & (comparison['lat_change_pct'] > threshold_pct)
+    lat_improvement = significant(comparison['lat_p_adj']) & (comparison['lat_change_pct'] < -threshold_pct)
+    success_regression = significant(comparison['success_p_adj']) & (comparison['success_change_pp'] < -success_threshold_pp)
+    success_improvement = significant(comparison['success_p_adj']) & (comparison['success_change_pp'] > success_threshold_pp)
+
+    untested_shift = (comparison['lat_test'] == 'inconclusivo') & (comparison['lat_change_pct'].abs() > threshold_pct)
+    # Significativos antes da correção por comparações múltiplas, mas não depois
+    lost_to_correction = (reachable & (comparison['lat_p'] < alpha) & ~significant(comparison['lat_p_adj'])
+                          & (comparison['lat_change_pct'].abs() > threshold_pct))
+
+    comparison['status'] = 'estável'
+    comparison.loc[untested_shift, 'status'] = 'inconclusivo'
+    comparison.loc[lat_improvement | success_improvement, 'status'] = 'melhoria'
+    comparison.loc[lat_regression | success_regression, 'status'] = 'regressão'
+
+    unmatched_base = base_df.groupby(GROUP_COLS).ngroups - len(comparison)
+    unmatched_cand = len(cand_groups) - len(comparison)
+
+    report_lines = []
+    report_lines.append("--- Comparação de Desempenho: Baseline vs. Candidato ---")
+    report_lines.append(f"Baseline:  {baseline_path} ({base_df['run_number'].nunique()} execuções)")
+    report_lines.append(f"Candidato: {candidate_path} ({cand_df['run_number'].nunique()} execuções)")
+    report_lines.append(f"Cenários comparados: {len(comparison)} (só no baseline: {unmatched_base}, só no candidato: {unmatched_cand})")
+    report_lines.append(f"Critério: p ajustado (BH) < {alpha} e latência {threshold_pct:+.1f}% "
+                        f"ou taxa de sucesso -{success_threshold_pp:.2f} p.p.\n")
+    if untested_shift.any():
+        report_lines.append(f"AVISO: {untested_shift.sum()} cenário(s) com latência além do limiar de {threshold_pct:.1f}% "
+                            f"foram marcados como inconclusivos e não contam como regressão: com "
+                            f"{len(comparison)} cenários comparados, o Mann-Whitney precisa de p < "
+                            f"{corrected_alpha:.2g} (alpha/m), o que exige pelo menos {runs_needed(corrected_alpha)} "
+                            f"execuções por lado.\n")
+    if lost_to_correction.any():
+        report_lines.append(f"AVISO: {lost_to_correction.sum()} cenário(s) com p < {alpha} e latência além do limiar "
+                            f"deixaram de ser significativos após a correção de Benjamini-Hochberg sobre "
+                            f"{comparison['lat_p'].notna().sum()} testes; mais execuções por lado aumentam o poder.\n")
+
+    display_cols = ['lat_base_ms', 'lat_cand_ms', 'lat_change_pct', 'lat_cliffs_delta', 'lat_test', 'lat_p_adj',
+                    'success_base_pct', 'success_cand_pct', 'success_change_pp', 'success_p_adj']
+    for status, title, ascending in [('regressão', 'Regressões', False), ('melhoria', 'Melhorias', True),
+                                     ('inconclusivo', 'Inconclusivos', False)]:
+        subset = comparison[comparison['status'] == status]
+        report_lines.append(f"{title} ({len(subset)}), ordenadas pelo tamanho do efeito:\n")
+        if not subset.empty:
+            # Ordena pelo delta de Cliff e, em empate (ex: todos ±1), pela variação de latência e da taxa de sucesso
+            subset = subset.sort_values(['lat_cliffs_delta', 'lat_change_pct', 'success_change_pp'],
+                                        ascending=[ascending, ascending, not ascending], na_position='last')
+            report_lines.append(subset.set_index(GROUP_COLS)[display_cols].round(4).to_string())
+        report_lines.append("\n" + "="*80 + "\n")
+
+    report_lines.append("Resumo por Linguagem:\n")
+    summary = comparison.groupby('language').agg(
+        cenarios=('status', 'size'),
+        regressoes=('status', lambda x: (x == 'regressão').sum()),
+        melhorias=('status', lambda x: (x == 'melhoria').sum()),
+        inconclusivos=('status', lambda x: (x == 'inconclusivo').sum()),
+        mediana_lat_change_pct=('lat_change_pct', 'median'),
+    ).round(3)
+    report_lines.append(summary.to_string())
+    report_lines.append("\n" + "="*80 + "\n")
+
+    write_report(report_lines, output_report_path, "Relatório de comparação")
+    return int((comparison['status'] == 'regressão').sum())
+
+def usl_model(n, lam, sigma, kappa):
+    """Universal Scalability Law: X(N) = λN / (1 + σ(N-1) + κN(N-1))."""
+    return lam * n / (1 + sigma * (n - 1) + kappa * n * (n - 1))
+
+def amdahl_model(n, lam, sigma):
+    """Lei de Amdahl: caso particular da USL com κ = 0."""
+    return usl_model(n, lam, sigma, 0.0)
+
+def fit_scalability(n, throughput):
+    """
+    Ajusta os modelos de Amdahl e USL a uma curva de throughput X(N).
+    Retorna um dicionário com os coeficientes, o pico previsto e a qualidade do ajuste (R², RMSE),
+    ou None se não houver pontos suficientes ou o ajuste não convergir.
+    Coeficientes que terminam nos limites do curve_fit são listados em 'no_limite'; com σ = 1
+    (throughput que só cai desde N = 1) ou λ = 0 o ajuste é degenerado e o pico fica em branco.
+    """
+    n = np.asarray(n, dtype=float)
+    throughput = np.asarray(throughput, dtype=float)
+    if len(n) < 4:
+        return None
+
+    lam0 = throughput[0] / n[0]
+    try:
+        (lam, sigma, kappa), _ = curve_fit(usl_model, n, throughput, p0=[lam0, 0.1, 0.001],
+                                           bounds=([0, 0, 0], [np.inf, 1, np.inf]), maxfev=10000)
+        (a_lam, a_sigma), _ = curve_fit(amdahl_model, n, throughput, p0=[lam0, 0.1],
+                                        bounds=([0, 0], [np.inf, 1]), maxfev=10000)
+    except (RuntimeError, ValueError):
+        return None
+
+    def quality(predicted):
+        residuals = throughput - predicted
+        ss_tot = np.sum((throughput - throughput.mean()) ** 2)
+        r2 = 1 - np.sum(residuals ** 2) / ss_tot if ss_tot > 0 else np.nan
+        return r2, np.sqrt(np.mean(residuals ** 2))
+
+    usl_r2, usl_rmse = quality(usl_model(n, lam, sigma, kappa))
+    amdahl_r2, amdahl_rmse = quality(amdahl_model(n, a_lam, a_sigma))
+
+    # Com κ > 0 o throughput tem máximo em N* = sqrt((1 - σ) / κ); acima disso o retorno é negativo.
+    # Sem coerência (κ ≈ 0) a curva só satura, no limite de Amdahl λ/σ.
+    if kappa > 1e-9:
+        peak_n = max(np.sqrt((1 - sigma) / kappa), 1.0)
+        peak_x = usl_model(peak_n, lam, sigma, kappa)
+    else:
+        peak_n = np.inf
+        peak_x = lam / sigma if sigma > 0 else np.inf
+
+    at_bounds = [name for name, hit in [
+        ('λ=0', lam <= BOUND_TOLERANCE), ('σ=0', sigma <= BOUND_TOLERANCE), ('σ=1', sigma >= 1 - BOUND_TOLERANCE),
+        ('κ=0', kappa <= BOUND_TOLERANCE), ('σ_amdahl=1', a_sigma >= 1 - BOUND_TOLERANCE),
+    ] if hit]
+    degenerate = 'σ=1' in at_bounds or 'λ=0' in at_bounds
+    if degenerate:
+        peak_n = peak_x = np.nan
+    return {
+        'lambda': lam, 'sigma': sigma, 'kappa': kappa,
+        'peak_n': peak_n, 'peak_throughput': peak_x,
+        'ajuste': 'degenerado' if degenerate else 'ok', 'no_limite': ','.join(at_bounds) or '-',
+        'usl_r2': usl_r2, 'usl_rmse': usl_rmse,
+        'amdahl_sigma': a_sigma, 'amdahl_r2': amdahl_r2, 'amdahl_rmse': amdahl_rmse,
+        'n_min': n.min(), 'n_max': n.max(),
+    }
+
+def _scalability_table(df, sweep_col, fixed_col):
+    """
+    Ajusta os modelos sobre `sweep_col` para cada (linguagem, `fixed_col`).
+    O throughput de cada cenário vem da lei de Little para clientes em laço fechado:
+    X = clientes / latência média (mensagens/s), com média sobre mensagens e execuções.
+    """
+    curves = df.groupby(['language', fixed_col, sweep_col])['throughput_msgs_s'].mean().reset_index()
+    rows = []
+    for (lang, fixed), curve in curves.groupby(['language', fixed_col]):
+        curve = curve.sort_values(sweep_col)
+        fit = fit_scalability(curve[sweep_col], curve['throughput_msgs_s'])
+        if fit is None:
+            continue
+        if np.isnan(fit['peak_n']):
+            beyond = '-'
+        elif fit['peak_n'] > fit['n_max']:
+            beyond = 'acima'
+        elif fit['peak_n'] < fit['n_min']:
+            beyond = 'abaixo'
+        else:
+            beyond = 'não'
+        rows.append({'language': lang, fixed_col: fixed, 'pontos': len(curve), **fit, 'pico_extrapolado': beyond})
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).set_index(['language', fixed_col])
+
+def generate_scalability_report(path, output_report_path=None, exclude_client_saturated=False):
+    """
+    Ajusta modelos de Amdahl e USL por linguagem às varreduras de réplicas e de concorrência,
+    reportando os coeficientes de contenção (σ) e coerência (κ), o throughput de pico previsto
+    e o ponto em que adicionar réplicas/clientes passa a reduzir o throughput.
+    """
+    df = load_results(path, exclude_client_saturated)
+    if df.empty:
+        print("O DataFrame está vazio após a limpeza. Nenhuma estatística para gerar.", file=sys.stderr)
+        return
+
+    df = df[(df['average_latency_ms'] > 0) & (df['scenario_success_rate'] > 0)].copy()
+    df['throughput_msgs_s'] = df['num_concurrent_clients_scenario'] * 1000 / df['average_latency_ms']
+
+    report_lines = []
+    report_lines.append("--- Relatório de Escalabilidade (Amdahl / USL) ---")
+    report_lines.append(f"Dados analisados de: {path}")
+    report_lines.append("Throughput estimado por cenário: X = clientes / latência média (mensagens/s).")
+    report_lines.append("USL: X(N) = λN / (1 + σ(N-1) + κN(N-1)); σ = contenção, κ = coerência, N* = sqrt((1-σ)/κ).\n")
+
+    sweeps = [
+        ('server_replicas', 'num_concurrent_clients_scenario', "Escalabilidade por Réplicas do Servidor (N = réplicas, por nível de clientes)"),
+        ('num_concurrent_clients_scenario', 'server_replicas', "Escalabilidade por Concorrência (N = clientes, por número de réplicas)"),
+    ]
+    for sweep_col, fixed_col, title in sweeps:
+        table = _scalability_table(df, sweep_col, fixed_col)
+        report_lines.append(f"{title}:\n")
+        if table.empty:
+            report_lines.append("Pontos insuficientes para o ajuste (mínimo de 4 valores distintos).")
+        else:
+            cols = ['pontos', 'ajuste', 'no_limite', 'lambda', 'sigma', 'kappa', 'peak_n', 'pico_extrapolado',
+                    'peak_throughput', 'usl_r2', 'usl_rmse', 'amdahl_sigma', 'amdahl_r2']
+            decimals = {'lambda': 1, 'sigma': 4, 'kappa': 6, 'peak_n': 2, 'peak_throughput': 1,
+                        'usl_r2': 3, 'usl_rmse': 1, 'amdahl_sigma': 4, 'amdahl_r2': 3}
+            report_lines.append(table[cols].round(decimals).to_string())
+            degenerate = (table['ajuste'] == 'degenerado').sum()
+            if degenerate:
+                report_lines.append(f"\nAVISO: {degenerate} ajuste(s) degenerado(s): σ terminou no limite de 1 (ou λ em 0), ou seja, "
+                                    f"o throughput não cresce com N na faixa medida. Os coeficientes desses ajustes não são "
+                                    f"estimativas de contenção/coerência, e o pico não é calculado.")
+        report_lines.append("\n" + "="*80 + "\n")
+
+    write_report(report_lines, output_report_path, "Relatório de escalabilidade")
+
+def find_knee(load, latency, min_distance=KNEE_MIN_DISTANCE):
+    """
+    Encontra o joelho de uma curva latência x carga: o ponto mais distante abaixo da
+    corda entre o primeiro e o último ponto, com os dois eixos normalizados para [0, 1].
+    Retorna o índice do joelho, ou None se nenhum ponto ficar pelo menos `min_distance`
+    abaixo da corda (curva sem curvatura convexa, ou só ruído em torno de uma reta).
+    """
+    load = np.asarray(load, dtype=float)
+    latency = np.asarray(latency, dtype=float)
+    if len(load) < 3 or np.ptp(load) == 0 or np.ptp(latency) == 0:
+        return None
+    x = (load - load.min()) / np.ptp(load)
+    y = (latency - latency.min()) / np.ptp(latency)
+    chord = y[0] + (y[-1] - y[0]) * (x - x[0]) / (x[-1] - x[0])
+    distance = chord - y
+    idx = int(np.argmax(distance))
+    return idx if distance[idx] >= min_distance and distance[idx] > 0 else None
+
+def _crossing(load, values, threshold, upper_bound):
+    """
+    Interpola linearamente a carga em que `values` cruza `threshold` pela primeira vez.
+    `upper_bound` indica se o SLO é um teto (latência) ou um piso (taxa de sucesso).
+    Retorna (carga, índice do primeiro ponto que viola o SLO) ou (None, None) se nenhum viola.
+    """
+    ok = values <= threshold if upper_bound else values >= threshold
+    violations = np.flatnonzero(~ok)
+    if len(violations) == 0:
+        return None, None
+    i = violations[0]
+    if i == 0:
+        return load[0], 0
+    x0, x1, y0, y1 = load[i - 1], load[i], values[i - 1], values[i]
+    return x0 + (threshold - y0) * (x1 - x0) / (y1 - y0) if y1 != y0 else x0, i
+
+def generate_capacity_report(path, output_report_path=None, slo_latency_ms=SLO_LATENCY_MS,
+                             slo_success_pct=SLO_SUCCESS_PCT, quantile=SLO_QUANTILE,
+                             latency_metric=SLO_LATENCY_METRIC, exclude_client_saturated=False,
+                             knee_min_distance=KNEE_MIN_DISTANCE):
+    """
+    Para cada linguagem e número de réplicas, encontra o joelho da curva latência x clientes
+    concorrentes e a maior carga que atende ao SLO (latência no quantil `quantile` <= `slo_latency_ms`
+    e taxa de sucesso média >= `slo_success_pct`), interpolando entre os pontos medidos.
+    """
+    df = load_results(path, exclude_client_saturated)
+    if df.empty:
+        print("O DataFrame está vazio após a limpeza. Nenhuma estatística para gerar.", file=sys.stderr)
+        return
+    if latency_metric not in df.columns:
+        print(f"Erro: Métrica de latência '{latency_metric}' não encontrada nos resultados.", file=sys.stderr)
+        sys.exit(1)
+
+    load_col = 'num_concurrent_clients_scenario'
+    # Cada ponto de carga reúne todas as execuções e tamanhos de mensagem; a latência do SLO é o
+    # quantil da métrica por cenário, já que os logs não guardam a latência de cada mensagem.
+    points = df.groupby(['language', 'server_replicas', load_col]).agg(
+        latency=(latency_metric, lambda x: x.quantile(quantile)),
+        success=('scenario_success_rate', 'mean'),
+    ).reset_index()
+
+    rows = []
+    for (lang, replicas), curve in points.groupby(['language', 'server_replicas']):
+        curve = curve.sort_values(load_col)
+        load = curve[load_col].to_numpy(dtype=float)
+        latency = curve['latency'].to_numpy()
+        success = curve['success'].to_numpy()
+
+        knee = find_knee(load, latency, knee_min_distance)
+        lat_cross, lat_idx = _crossing(load, latency, slo_latency_ms, upper_bound=True)
+        succ_cross, succ_idx = _crossing(load, success, slo_success_pct, upper_bound=False)
+
+        crossings = [(c, i, name) for c, i, name in [(lat_cross, lat_idx, 'latência'), (succ_cross, succ_idx, 'sucesso')] if c is not None]
+        if not crossings:
+            capacity, measured, limit = f">= {load[-1]:.0f}", load[-1], '-'
+        else:
+            capacity, first_fail, limit = min(crossings)
+            measured = load[first_fail - 1] if first_fail > 0 else np.nan
+            capacity = f"< {load[0]:.0f}" if first_fail == 0 else f"{capacity:.1f}"
+
+        rows.append({
+            'language': lang, 'server_replicas': replicas,
+            'joelho_clientes': load[knee] if knee is not None else np.nan,
+            'joelho_latencia_ms': latency[knee] if knee is not None else np.nan,
+            'max_clientes_slo_medido': measured,
+            'capacidade_slo_interpolada': capacity,
+            'limitado_por': limit,
+            f'latencia_p{quantile * 100:g}_max_carga_ms': latency[-1],
+            'sucesso_max_carga_pct': success[-1],
+        })
+
+    report_lines = []
+    report_lines.append("--- Relatório de Capacidade e Saturação ---")
+    report_lines.append(f"Dados analisados de: {path}")
+    report_lines.append(f"SLO: p{quantile * 100:g} de {latency_metric} <= {slo_latency_ms} ms e taxa de sucesso >= {slo_success_pct}%.")
+    report_lines.append(f"O p{quantile * 100:g} é calculado sobre todas as execuções e tamanhos de mensagem de cada ponto de carga.")
+    report_lines.append(f"Joelho: ponto a pelo menos {knee_min_distance:g} abaixo da corda (eixos normalizados); sem joelho = NaN.\n")
+    report_lines.append("Capacidade por Linguagem e Réplicas (carga = clientes concorrentes):\n")
+    report_lines.append(pd.DataFrame(rows).set_index(['language', 'server_replicas']).round(3).to_string())
+    report_lines.append("\n" + "="*80 + "\n")
+
+    write_report(report_lines, output_report_path, "Relatório de capacidade")
+
 if __name__ == "__main__":
-    if len(sys.argv) not in [2, 3]:
-        print("Uso: python3 analyze_results.py <input_combined_csv_path> [output_report_path]", file=sys.stderr)
+    parser = argparse.ArgumentParser(
+        description="Gera relatórios de análise dos resultados dos testes de carga.",
+        epilog=f"No modo --compare, o código de saída é {REGRESSION_EXIT_CODE} quando alguma regressão é encontrada.")
+    parser.add_argument('input', nargs='?', help="CSV combinado de uma execução ou diretório base de logs (todas as execuções)")
+    parser.add_argument('output', nargs='?', help="Arquivo de saída do relatório (padrão: saída padrão)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="Compara dois conjuntos de resultados (diretórios de logs ou CSVs)")
+    parser.add_argument('--scalability', action='store_true',
+                        help="Ajusta os modelos de Amdahl e USL às varreduras de réplicas e concorrência")
+    parser.add_argument('--capacity', action='store_true',
+                        help="Detecta o joelho de saturação e a capacidade que atende ao SLO")
+    parser.add_argument('--slo-latency-ms', type=float, default=SLO_LATENCY_MS,
+                        help=f"Latência máxima do SLO em ms (padrão: {SLO_LATENCY_MS})")
+    parser.add_argument('--slo-success-pct', type=float, default=SLO_SUCCESS_PCT,
+                        help=f"Taxa de sucesso mínima do SLO em %% (padrão: {SLO_SUCCESS_PCT})")
+    parser.add_argument('--slo-quantile', type=float, default=SLO_QUANTILE,
+                        help=f"Quantil da latência avaliado no SLO (padrão: {SLO_QUANTILE})")
+    parser.add_argument('--slo-latency-metric', default=SLO_LATENCY_METRIC,
+                        help=f"Coluna de latência usada no SLO (padrão: {SLO_LATENCY_METRIC})")
+    parser.add_argument('--knee-min-distance', type=float, default=KNEE_MIN_DISTANCE,
+                        help=f"Distância normalizada mínima abaixo da corda para detectar o joelho (padrão: {KNEE_MIN_DISTANCE})")
+    parser.add_argument('--exclude-client-saturated', action='store_true',
+                        help="Exclui cenários em que o gerador de carga (client.py) saturou; por padrão eles são apenas anotados")
+    parser.add_argument('--threshold-pct', type=float, default=REGRESSION_THRESHOLD_PCT,
+                        help=f"Piora mínima de latência (%%) para contar como regressão (padrão: {REGRESSION_THRESHOLD_PCT})")
+    parser.add_argument('--success-threshold-pp', type=float, default=SUCCESS_THRESHOLD_PP,
+                        help=f"Queda mínima da taxa de sucesso (pontos percentuais) para contar como regressão (padrão: {SUCCESS_THRESHOLD_PP})")
+    parser.add_argument('--alpha', type=float, default=SIGNIFICANCE_ALPHA,
+                        help=f"Nível de significância dos testes (padrão: {SIGNIFICANCE_ALPHA})")
+    args = parser.parse_args()
+
+    if args.compare:
+        if args.output:
+            parser.error("no modo --compare informe apenas o arquivo de saída como posicional")
+        regressions = compare_results(args.compare[0], args.compare[1], args.input,
+                                      args.threshold_pct, args.success_threshold_pp, args.alpha,
+                                      args.exclude_client_saturated)
+        if regressions:
+            print(f"{regressions} regressão(ões) acima do limiar encontrada(s).", file=sys.stderr)
+            sys.exit(REGRESSION_EXIT_CODE)
+    elif args.input is None:
+        parser.print_usage(sys.stderr)
         sys.exit(1)
-    
-    generate_statistics(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else None)
\ No newline at end of file
+    elif args.capacity:
+        generate_capacity_report(args.input, args.output, args.slo_latency_ms, args.slo_success_pct,
+                                 args.slo_quantile, args.slo_latency_metric, args.exclude_client_saturated,
+                                 args.knee_min_distance)
+    elif args.scalability:
+        generate_scalability_report(args.input, args.output, args.exclude_client_saturated)
+    elif os.path.isdir(args.input):
+        generate_aggregated_statistics(args.input, args.output, args.exclude_client_saturated)
+    else:
+        generate_statistics(args.input, args.output, args.exclude_client_saturated)
@@ -2,7 +2,14 @@
 import asyncio
 import time
 import os
+import sys
 import json # For structured logging
+import heapq
+import ssl
+import resource
+from array import array
+
+from profiling import ProfilingHooks
 
 SERVER_IP = os.environ.get("SERVER_IP", "localhost")
 SERVER_PORT = int(os.environ.get("SERVER_PORT", 8080))
@@ -10,13 +17,282 @@ MESSAGE_PREFIX = os.environ.get("MESSAGE_PREFIX", "Hello from client!")
 CLIENT_ID_BASE = os.environ.get("CLIENT_ID", "default_client_pod")
 NUM_MESSAGES_PER_CLIENT = int(os.environ.get("NUM_MESSAGES_PER_CLIENT", 1))
 NUM_CONCURRENT_CLIENTS = int(os.environ.get("NUM_CONCURRENT_CLIENTS", 1))
+# Lote de cenários executados em sequência no mesmo processo: lista JSON em SCENARIOS ou em um arquivo
+# apontado por SCENARIO_FILE, ex: [{"scenario": "python-2s-10c-1m", "num_concurrent_clients": 10, "num_messages_per_client": 1}]
+SCENARIOS = os.environ.get("SCENARIOS")
+SCENARIO_FILE = os.environ.get("SCENARIO_FILE")
+SCENARIO_PAUSE_S = float(os.environ.get("SCENARIO_PAUSE_S", 2))
+# Detecção de saturação do próprio gerador de carga: intervalo de amostragem e limites que invalidam o cenário
+MONITOR_INTERVAL_S = float(os.environ.get("MONITOR_INTERVAL_S", 0.05))
+MAX_LOOP_LAG_MS = float(os.environ.get("MAX_LOOP_LAG_MS", 10))
+MAX_CPU_PCT = float(os.environ.get("MAX_CPU_PCT", 90))
+MAX_SCHEDULING_DELAY_MS = float(os.environ.get("MAX_SCHEDULING_DELAY_MS", 100))
+# Exemplares de cauda: quantas mensagens mais lentas guardar por conexão e no total do pod
+TAIL_EXEMPLARS_PER_CONNECTION = int(os.environ.get("TAIL_EXEMPLARS_PER_CONNECTION", 5))
+TAIL_EXEMPLARS_PER_POD = int(os.environ.get("TAIL_EXEMPLARS_PER_POD", 50))
+# Transporte: 'tcp' (padrão), 'tls' (certificado do servidor não verificado, com retomada de sessão
+# se TLS_RESUME=1) ou 'udp' (datagramas sem resposta em UDP_TIMEOUT_S contam como perdidos)
+TRANSPORT = os.environ.get("TRANSPORT", "tcp").lower()
+TLS_RESUME = os.environ.get("TLS_RESUME", "1") == "1"
+UDP_TIMEOUT_S = float(os.environ.get("UDP_TIMEOUT_S", 1.0))
+# Modo de muitas conexões (HIGH_CONNECTION_MODE=1): estatísticas em colunas, conexões iniciadas em lotes de
+# CONNECT_BATCH_SIZE a cada CONNECT_BATCH_INTERVAL_S e mantidas abertas, ociosas, por CONNECTION_HOLD_S
+HIGH_CONNECTION_MODE = os.environ.get("HIGH_CONNECTION_MODE", "0") == "1"
+CONNECT_BATCH_SIZE = int(os.environ.get("CONNECT_BATCH_SIZE", 500))
+CONNECT_BATCH_INTERVAL_S = float(os.environ.get("CONNECT_BATCH_INTERVAL_S", 0.05))
+CONNECTION_HOLD_S = float(os.environ.get("CONNECTION_HOLD_S", 0))
+# Descritores reservados além de um por conexão (stdout, loop de eventos, etc.)
+FD_HEADROOM = 64
+# Converte perf_counter em epoch, a mesma base das amostras do servidor (server_samples)
+EPOCH_OFFSET = time.time() - time.perf_counter()
+
+def load_scenarios():
+    """
+    Retorna a lista de cenários a executar. Sem SCENARIOS/SCENARIO_FILE, executa um único
+    cenário a partir de NUM_CONCURRENT_CLIENTS/NUM_MESSAGES_PER_CLIENT, sem rótulos.
+    """
+    if SCENARIO_FILE:
+        with open(SCENARIO_FILE) as f:
+            scenarios = json.load(f)
+    elif SCENARIOS:
+        scenarios = json.loads(SCENARIOS)
+    else:
+        return [{"num_concurrent_clients": NUM_CONCURRENT_CLIENTS, "num_messages_per_client": NUM_MESSAGES_PER_CLIENT}]
+    return [dict(s, num_concurrent_clients=int(s["num_concurrent_clients"]),
+                 num_messages_per_client=int(s["num_messages_per_client"])) for s in scenarios]
+
+def scenario_labels(scenario):
+    """Rótulos anexados a cada registro quando o cenário faz parte de um lote."""
+    if "scenario" not in scenario:
+        return {}
+    return {
+        "scenario": scenario["scenario"],
+        "num_concurrent_clients_scenario": scenario["num_concurrent_clients"],
+        "num_messages_per_client_scenario": scenario["num_messages_per_client"],
+    }
+
+def percentile(values, q):
+    """Percentil por vizinho mais próximo de uma lista (0 se vazia)."""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(int(q / 100 * len(ordered)), len(ordered) - 1)]
+
+class ResumingTLSContext(ssl.SSLContext):
+    """
+    Contexto TLS do cliente que oferece a última sessão obtida em cada novo handshake. O asyncio
+    não expõe o parâmetro `session`, então ele é injetado aqui na criação do SSLObject.
+    """
+
+    resume_session = None
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        return super().wrap_bio(incoming, outgoing, server_side, server_hostname, session or self.resume_session)
+
+_tls_context = None
+
+def tls_client_context():
+    global _tls_context
+    if _tls_context is None:
+        _tls_context = ResumingTLSContext(ssl.PROTOCOL_TLS_CLIENT)
+        # O servidor usa um certificado autoassinado gerado na partida
+        _tls_context.check_hostname = False
+        _tls_context.verify_mode = ssl.CERT_NONE
+    return _tls_context
 
-async def connect_and_send(client_instance_id):
+def remember_tls_session(writer):
+    """
+    Guarda a sessão da conexão para as próximas. No TLS 1.3 o ticket só chega depois do
+    handshake, por isso isto é chamado após a primeira resposta.
+    """
+    if TLS_RESUME:
+        tls_client_context().resume_session = writer.get_extra_info('ssl_object').session
+
+async def prime_tls_session():
+    """Handshake completo de aquecimento, fora das medições, para que as conexões do cenário possam retomar a sessão."""
+    reader, writer = await asyncio.open_connection(SERVER_IP, SERVER_PORT, ssl=tls_client_context())
+    writer.write(b"prime")
+    await writer.drain()
+    await reader.read(1024)
+    remember_tls_session(writer)
+    writer.close()
+    await writer.wait_closed()
+
+class DatagramClientProtocol(asyncio.DatagramProtocol):
+    """Entrega as respostas (ou erros, como ICMP port unreachable) do socket UDP a uma fila."""
+
+    def __init__(self):
+        self.responses = asyncio.Queue()
+
+    def datagram_received(self, data, addr):
+        self.responses.put_nowait(data)
+
+    def error_received(self, exc):
+        self.responses.put_nowait(exc)
+
+async def send_datagrams(log_data, exemplars, client_full_id, num_messages):
+    """Eco UDP: cada mensagem espera sua resposta por até UDP_TIMEOUT_S; respostas atrasadas de mensagens já dadas como perdidas são descartadas."""
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(DatagramClientProtocol, remote_addr=(SERVER_IP, SERVER_PORT))
+    log_data["connection_success"] = True
+    log_data["datagrams_lost"] = 0
+    log_data["datagrams_late"] = 0
+    try:
+        for i in range(num_messages):
+            payload = f"{MESSAGE_PREFIX} (from {client_full_id} - msg {i+1})".encode('utf-8')
+            start_time = time.perf_counter()
+            transport.sendto(payload)
+            log_data["messages_sent"] += 1
+            deadline = start_time + UDP_TIMEOUT_S
+            while True:
+                try:
+                    response = await asyncio.wait_for(protocol.responses.get(), max(deadline - time.perf_counter(), 0))
+                except asyncio.TimeoutError:
+                    log_data["datagrams_lost"] += 1
+                    break
+                if isinstance(response, Exception):
+                    raise response
+                if response != payload:
+                    log_data["datagrams_late"] += 1
+                    continue
+                latency_ms = (time.perf_counter() - start_time) * 1000
+                log_data["total_latency_ms"] += latency_ms
+                log_data["messages_received"] += 1
+                exemplars.offer(latency_ms, (start_time + EPOCH_OFFSET, client_full_id, i, len(payload), len(response)))
+                break
+    finally:
+        transport.close()
+
+class TransportStats:
+    """Acumula as métricas específicas do transporte das conexões de um cenário para o client_summary."""
+
+    def __init__(self):
+        self.handshakes_ms = []
+        self.resumed = 0
+        self.datagrams_sent = 0
+        self.datagrams_lost = 0
+
+    def record(self, log_data):
+        if "handshake_ms" in log_data:
+            self.handshakes_ms.append(log_data["handshake_ms"])
+        self.resumed += bool(log_data.get("tls_resumed"))
+        if "datagrams_lost" in log_data:
+            self.datagrams_sent += log_data["messages_sent"]
+            self.datagrams_lost += log_data["datagrams_lost"]
+
+    def summary(self):
+        summary = {"transport": TRANSPORT}
+        if TRANSPORT in ("tcp", "tls"):
+            summary["handshake_mean_ms"] = sum(self.handshakes_ms) / len(self.handshakes_ms) if self.handshakes_ms else 0
+            summary["handshake_p99_ms"] = percentile(self.handshakes_ms, 99)
+        if TRANSPORT == "tls":
+            summary["tls_resumption_rate"] = self.resumed / len(self.handshakes_ms) * 100 if self.handshakes_ms else 0
+        if TRANSPORT == "udp":
+            summary["datagram_loss_pct"] = self.datagrams_lost / self.datagrams_sent * 100 if self.datagrams_sent else 0
+        return summary
+
+class TailExemplars:
+    """
+    Guarda as k mensagens mais lentas em um heap mínimo de tamanho fixo: cada nova latência só
+    entra se superar a menor já guardada. Cada conexão tem o seu e, ao terminar, é mesclado no do pod.
+    """
+
+    FIELDS = ("timestamp", "client_full_id", "message_index", "bytes_sent", "bytes_received")
+
+    def __init__(self, k):
+        self.k = k
+        self.heap = []
+
+    def offer(self, latency_ms, entry):
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, (latency_ms, entry))
+        elif latency_ms > self.heap[0][0]:
+            heapq.heapreplace(self.heap, (latency_ms, entry))
+
+    def merge(self, other):
+        for latency_ms, entry in other.heap:
+            self.offer(latency_ms, entry)
+
+    def entries(self):
+        """Exemplares da mais lenta para a mais rápida."""
+        return [{**dict(zip(self.FIELDS, entry)), "latency_ms": latency_ms}
+                for latency_ms, entry in sorted(self.heap, reverse=True)]
+
+class LoadGeneratorMonitor:
+    """
+    Mede se o próprio cliente limitou o resultado de um cenário:
+      - atraso do loop de eventos: quanto um sleep de MONITOR_INTERVAL_S acorda atrasado;
+      - uso de CPU do processo: tempo de CPU / tempo de parede, no total e por intervalo;
+      - atraso de agendamento: tempo entre o início do cenário, quando todos os envios ficam
+        devidos, e o momento em que cada conexão de fato começa a executar. Os envios seguintes
+        saem logo após a resposta anterior, então o atraso deles aparece no atraso do loop.
+    """
+
+    def __init__(self, interval=MONITOR_INTERVAL_S):
+        self.interval = interval
+        self.loop_lags_ms = []
+        self.interval_cpu_pct = []
+        self.scheduling_delays_ms = []
+        self.started_wall = time.perf_counter()
+        self.started_epoch = time.time()
+        self.started_cpu = time.process_time()
+
+    def record_scheduling_delay(self, due_time):
+        self.scheduling_delays_ms.append((time.perf_counter() - due_time) * 1000)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            before_loop, before_wall, before_cpu = loop.time(), time.perf_counter(), time.process_time()
+            await asyncio.sleep(self.interval)
+            self.loop_lags_ms.append(max(loop.time() - before_loop - self.interval, 0) * 1000)
+            wall = time.perf_counter() - before_wall
+            if wall > 0:
+                self.interval_cpu_pct.append((time.process_time() - before_cpu) / wall * 100)
+
+    def summary(self, labels):
+        wall = time.perf_counter() - self.started_wall
+        cpu_pct = (time.process_time() - self.started_cpu) / wall * 100 if wall > 0 else 0
+        summary = {
+            **labels,
+            "type": "client_summary",
+            "client_id": CLIENT_ID_BASE,
+            "duration_s": wall,
+            # Epoch, mesma base dos timestamps das amostras do servidor (server_samples)
+            "started_at": self.started_epoch,
+            "finished_at": self.started_epoch + wall,
+            "loop_lag_mean_ms": sum(self.loop_lags_ms) / len(self.loop_lags_ms) if self.loop_lags_ms else 0,
+            "loop_lag_p99_ms": percentile(self.loop_lags_ms, 99),
+            "loop_lag_max_ms": max(self.loop_lags_ms, default=0),
+            "cpu_pct": cpu_pct,
+            "cpu_pct_max_interval": max(self.interval_cpu_pct, default=0),
+            "scheduling_delay_p99_ms": percentile(self.scheduling_delays_ms, 99),
+            "scheduling_delay_max_ms": max(self.scheduling_delays_ms, default=0),
+        }
+        violations = []
+        if summary["loop_lag_p99_ms"] > MAX_LOOP_LAG_MS:
+            violations.append("loop_lag")
+        # Cenários curtos demais para duas amostras têm o uso de CPU dominado pela inicialização
+        if len(self.interval_cpu_pct) >= 2 and summary["cpu_pct"] > MAX_CPU_PCT:
+            violations.append("cpu")
+        if summary["scheduling_delay_p99_ms"] > MAX_SCHEDULING_DELAY_MS:
+            violations.append("scheduling_delay")
+        summary["client_saturated"] = bool(violations)
+        summary["saturation_reasons"] = violations
+        return summary
+
+async def connect_and_send(client_instance_id, num_messages, labels, monitor=None, due_time=None, pod_exemplars=None,
+                           transport_stats=None):
+    if monitor is not None:
+        monitor.record_scheduling_delay(due_time)
     client_full_id = f"{CLIENT_ID_BASE}-{client_instance_id}"
+    exemplars = TailExemplars(TAIL_EXEMPLARS_PER_CONNECTION)
     log_data = {
+        **labels,
         "client_full_id": client_full_id,
         "server_ip": SERVER_IP,
         "server_port": SERVER_PORT,
+        "transport": TRANSPORT,
         "messages_sent": 0,
         "messages_received": 0,
         "connection_success": False,
@@ -25,15 +301,25 @@ async def connect_and_send(client_instance_id):
     }
 
     try:
-        reader, writer = await asyncio.open_connection(SERVER_IP, SERVER_PORT)
+        if TRANSPORT == "udp":
+            await send_datagrams(log_data, exemplars, client_full_id, num_messages)
+            return
+        # O tempo de conexão inclui o handshake TLS no transporte 'tls'
+        connect_start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(
+            SERVER_IP, SERVER_PORT, ssl=tls_client_context() if TRANSPORT == "tls" else None)
+        log_data["handshake_ms"] = (time.perf_counter() - connect_start) * 1000
+        if TRANSPORT == "tls":
+            log_data["tls_resumed"] = writer.get_extra_info('ssl_object').session_reused
         log_data["connection_success"] = True
         # print(f"[{client_full_id}] Connected to {SERVER_IP}:{SERVER_PORT}")
 
-        for i in range(NUM_MESSAGES_PER_CLIENT):
+        for i in range(num_messages):
             full_message = f"{MESSAGE_PREFIX} (from {client_full_id} - msg {i+1})"
-            
+            payload = full_message.encode('utf-8')
+
             start_time = time.perf_counter()
-            writer.write(full_message.encode('utf-8'))
+            writer.write(payload)
             await writer.drain()
             log_data["messages_sent"] += 1
 
@@ -42,6 +328,9 @@ async def connect_and_send(client_instance_id):
             latency_ms = (end_time - start_time) * 1000
             log_data["total_latency_ms"] += latency_ms
             log_data["messages_received"] += 1
+            exemplars.offer(latency_ms, (start_time + EPOCH_OFFSET, client_full_id, i, len(payload), len(response)))
+            if i == 0 and TRANSPORT == "tls":
+                remember_tls_session(writer)
 
             # print(f"[{client_full_id}] Sent: '{full_message}', Received: '{response.decode('utf-8').strip()}' Latency: {latency_ms:.2f}ms")
 
@@ -61,7 +350,11 @@ async def connect_and_send(client_instance_id):
         if 'writer' in locals() and not writer.is_closing():
             writer.close()
             await writer.wait_closed()
-        
+        if pod_exemplars is not None:
+            pod_exemplars.merge(exemplars)
+        if transport_stats is not None:
+            transport_stats.record(log_data)
+
         # Log results for this client instance
         if log_data["messages_received"] > 0:
             log_data["average_latency_ms"] = log_data["total_latency_ms"] / log_data["messages_received"]
@@ -71,30 +364,258 @@ async def connect_and_send(client_instance_id):
         # Output structured log for later parsing
         print(json.dumps(log_data))
 
-async def main():
+def rss_bytes():
+    """RSS atual do processo (no Linux); fora dele, o pico de RSS."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def raise_fd_limit(num_connections):
+    """Sobe o limite flexível de descritores (até o rígido) para caber todas as conexões; retorna o limite final."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = num_connections + FD_HEADROOM
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        soft = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        print(f"[{CLIENT_ID_BASE}] WARNING: file descriptor limit {soft} is below the {needed} needed; connections may fail.")
+    return soft
+
+class ErrorCodes:
+    """
+    Erros internados: cada texto distinto recebe um código de um byte, guardado por conexão
+    no lugar da string formatada. O código 0 é 'sem erro'; a partir de 255 os textos se agrupam.
+    """
+
+    OVERFLOW = 255
+
+    def __init__(self):
+        self.texts = [None]
+        self.codes = {}
+
+    def code(self, text):
+        code = self.codes.get(text)
+        if code is None:
+            if len(self.texts) >= self.OVERFLOW:
+                return self.OVERFLOW
+            code = self.codes[text] = len(self.texts)
+            self.texts.append(text)
+        return code
+
+    def text(self, code):
+        return "Other error (error table full)" if code == self.OVERFLOW else self.texts[code]
+
+class ConnectionTable:
+    """
+    Estatísticas das conexões em colunas (array), indexadas pelo número da conexão: cerca de
+    30 bytes por conexão, contra um dict e uma lista de erros por conexão no modo normal.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.messages_sent = array('I', bytes(4 * size))
+        self.messages_received = array('I', bytes(4 * size))
+        self.total_latency_ms = array('d', bytes(8 * size))
+        self.handshake_ms = array('d', bytes(8 * size))
+        self.connection_success = array('b', bytes(size))
+        self.tls_resumed = array('b', bytes(size))
+        self.error_code = array('B', bytes(size))
+        self.errors = ErrorCodes()
+        self.active = 0
+        self.peak_active = 0
+        self.rss_at_peak = 0
+
+    def sample_memory(self):
+        """Registra o RSS quando o número de conexões abertas atinge um novo pico."""
+        if self.active > self.peak_active:
+            self.peak_active = self.active
+            self.rss_at_peak = rss_bytes()
+
+    def records(self, labels, id_prefix):
+        """Gera, uma a uma, as linhas por conexão no mesmo formato do modo normal."""
+        for index in range(self.size):
+            received = self.messages_received[index]
+            record = {
+                **labels,
+                "client_full_id": f"{CLIENT_ID_BASE}-{id_prefix}{index}",
+                "server_ip": SERVER_IP,
+                "server_port": SERVER_PORT,
+                "transport": TRANSPORT,
+                "messages_sent": self.messages_sent[index],
+                "messages_received": received,
+                "connection_success": bool(self.connection_success[index]),
+                "total_latency_ms": self.total_latency_ms[index],
+                "errors": [self.errors.text(self.error_code[index])] if self.error_code[index] else [],
+            }
+            if self.connection_success[index]:
+                record["handshake_ms"] = self.handshake_ms[index]
+                if TRANSPORT == "tls":
+                    record["tls_resumed"] = bool(self.tls_resumed[index])
+            record["average_latency_ms"] = self.total_latency_ms[index] / received if received else 0
+            yield record
+
+async def compact_connection(index, table, id_prefix, num_messages, monitor, due_time, pod_exemplars):
+    """Conexão do modo de muitas conexões: o estado vive na ConnectionTable, não em variáveis da corrotina."""
+    monitor.record_scheduling_delay(due_time)
+    writer = None
+    try:
+        connect_start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(
+            SERVER_IP, SERVER_PORT, ssl=tls_client_context() if TRANSPORT == "tls" else None)
+        table.handshake_ms[index] = (time.perf_counter() - connect_start) * 1000
+        if TRANSPORT == "tls":
+            table.tls_resumed[index] = writer.get_extra_info('ssl_object').session_reused
+        table.connection_success[index] = 1
+        table.active += 1
+
+        for i in range(num_messages):
+            payload = f"{MESSAGE_PREFIX} (from {CLIENT_ID_BASE}-{id_prefix}{index} - msg {i+1})".encode('utf-8')
+            start_time = time.perf_counter()
+            writer.write(payload)
+            await writer.drain()
+            table.messages_sent[index] += 1
+            response = await reader.read(1024)
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            table.total_latency_ms[index] += latency_ms
+            table.messages_received[index] += 1
+            pod_exemplars.offer(latency_ms, (start_time + EPOCH_OFFSET, f"{CLIENT_ID_BASE}-{id_prefix}{index}", i,
+                                             len(payload), len(response)))
+            if i == 0 and TRANSPORT == "tls":
+                remember_tls_session(writer)
+
+        if CONNECTION_HOLD_S > 0:
+            await asyncio.sleep(CONNECTION_HOLD_S)
+    except ConnectionRefusedError:
+        table.error_code[index] = table.errors.code(f"Connection refused by {SERVER_IP}:{SERVER_PORT}. Server might not be ready.")
+    except asyncio.TimeoutError:
+        table.error_code[index] = table.errors.code(f"Connection timeout to {SERVER_IP}:{SERVER_PORT}.")
+    except Exception as e:
+        # Só o tipo da exceção: a mensagem formatada tornaria cada erro único
+        table.error_code[index] = table.errors.code(f"An error occurred: {type(e).__name__}")
+    finally:
+        if writer is not None:
+            table.active -= 1
+            if not writer.is_closing():
+                writer.close()
+                await writer.wait_closed()
+
+async def main_high_connection(num_clients, num_messages, labels, id_prefix=""):
+    """
+    Variante de main() para dezenas de milhares de conexões: sobe o limite de descritores, inicia
+    as conexões em lotes sem guardar uma lista de corrotinas e mede a memória por conexão aberta.
+    """
+    print(f"[{CLIENT_ID_BASE}] Starting {num_clients} connections in batches of {CONNECT_BATCH_SIZE}, each sending {num_messages} messages.")
+    fd_limit = raise_fd_limit(num_clients)
+    if TRANSPORT == "tls" and TLS_RESUME and tls_client_context().resume_session is None:
+        await prime_tls_session()
+    table = ConnectionTable(num_clients)
+    pod_exemplars = TailExemplars(TAIL_EXEMPLARS_PER_POD)
+    rss_baseline = rss_bytes()
+    monitor = LoadGeneratorMonitor()
+    sampler = asyncio.create_task(monitor.run())
+
+    # O loop só guarda referências fracas às tarefas; o conjunto as mantém vivas até terminarem
+    tasks = set()
+    for start in range(0, num_clients, CONNECT_BATCH_SIZE):
+        due_time = time.perf_counter()
+        for index in range(start, min(start + CONNECT_BATCH_SIZE, num_clients)):
+            task = asyncio.create_task(compact_connection(index, table, id_prefix, num_messages, monitor, due_time, pod_exemplars))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.sleep(CONNECT_BATCH_INTERVAL_S)
+        table.sample_memory()
+    while tasks:
+        await asyncio.wait(set(tasks), timeout=max(CONNECT_BATCH_INTERVAL_S, 0.5))
+        table.sample_memory()
+    sampler.cancel()
+
+    transport_stats = TransportStats()
+    for record in table.records(labels, id_prefix):
+        transport_stats.record(record)
+        print(json.dumps(record))
+
+    summary = monitor.summary(labels)
+    summary.update(transport_stats.summary())
+    summary.update({
+        "connection_mode": "high",
+        "fd_limit": fd_limit if fd_limit != resource.RLIM_INFINITY else -1,
+        "peak_open_connections": table.peak_active,
+        "rss_baseline_bytes": rss_baseline,
+        "rss_at_peak_bytes": table.rss_at_peak,
+        "memory_per_connection_bytes": (table.rss_at_peak - rss_baseline) / table.peak_active if table.peak_active else 0,
+    })
+    summary["tail_exemplars"] = pod_exemplars.entries()
+    print(json.dumps(summary))
+    if summary["client_saturated"]:
+        print(f"[{CLIENT_ID_BASE}] WARNING: load generator saturated ({', '.join(summary['saturation_reasons'])}); results may be client-bound.")
+    print(f"[{CLIENT_ID_BASE}] All client tasks completed.")
+
+async def main(num_clients, num_messages, labels, id_prefix=""):
     tasks = []
-    print(f"[{CLIENT_ID_BASE}] Starting {NUM_CONCURRENT_CLIENTS} concurrent client tasks, each sending {NUM_MESSAGES_PER_CLIENT} messages.")
-    for i in range(NUM_CONCURRENT_CLIENTS):
-        tasks.append(connect_and_send(i))
-    
+    print(f"[{CLIENT_ID_BASE}] Starting {num_clients} concurrent client tasks, each sending {num_messages} messages.")
+    if TRANSPORT == "tls" and TLS_RESUME and tls_client_context().resume_session is None:
+        await prime_tls_session()
+    monitor = LoadGeneratorMonitor()
+    pod_exemplars = TailExemplars(TAIL_EXEMPLARS_PER_POD)
+    transport_stats = TransportStats()
+    sampler = asyncio.create_task(monitor.run())
+    due_time = time.perf_counter()
+    for i in range(num_clients):
+        tasks.append(connect_and_send(f"{id_prefix}{i}", num_messages, labels, monitor, due_time, pod_exemplars, transport_stats))
+
     # Run all client tasks concurrently
     await asyncio.gather(*tasks)
+    sampler.cancel()
+    summary = monitor.summary(labels)
+    summary.update(transport_stats.summary())
+    summary["tail_exemplars"] = pod_exemplars.entries()
+    print(json.dumps(summary))
+    if summary["client_saturated"]:
+        print(f"[{CLIENT_ID_BASE}] WARNING: load generator saturated ({', '.join(summary['saturation_reasons'])}); results may be client-bound.")
     print(f"[{CLIENT_ID_BASE}] All client tasks completed.")
 
-if __name__ == "__main__":
-    # Tenta conectar várias vezes caso o servidor ainda não esteja pronto
+# Profiling sob demanda (PROFILE_MODE ou PROFILE_SIGNAL); o perfil leva os rótulos do cenário em execução
+profiling_hooks = ProfilingHooks("client")
+
+def run_scenario(scenario, id_prefix=""):
+    """Executa um cenário, tentando de novo caso o servidor ainda não esteja pronto."""
     max_retries = 3 # Reduced retries, asyncio connect handles some retry implicitly
     retry_delay = 5 # seconds
-    
-    connected_at_least_once = False
-    for i in range(max_retries):
-        try:
-            asyncio.run(main())
-            connected_at_least_once = True
-            break
-        except Exception as e:
-            print(f"[{CLIENT_ID_BASE}] Attempt {i+1}/{max_retries} failed: {e}. Retrying in {retry_delay}s...")
-            time.sleep(retry_delay)
-    
-    if not connected_at_least_once:
-        print(f"[{CLIENT_ID_BASE}] Failed to run client tasks after {max_retries} attempts.")
\ No newline at end of file
+    labels = scenario_labels(scenario)
+    profiling_hooks.labels = lambda: labels
+    profiling_hooks.start_from_env()
+
+    try:
+        for i in range(max_retries):
+            try:
+                entry = main_high_connection if HIGH_CONNECTION_MODE else main
+                asyncio.run(entry(scenario["num_concurrent_clients"], scenario["num_messages_per_client"],
+                                  labels, id_prefix))
+                return True
+            except Exception as e:
+                print(f"[{CLIENT_ID_BASE}] Attempt {i+1}/{max_retries} failed: {e}. Retrying in {retry_delay}s...")
+                time.sleep(retry_delay)
+
+        print(f"[{CLIENT_ID_BASE}] Failed to run client tasks after {max_retries} attempts.")
+        return False
+    finally:
+        profiling_hooks.stop("scenario_end")
+
+if __name__ == "__main__":
+    # Erro de configuração: sai logo, em vez de esgotar as tentativas de run_scenario
+    if HIGH_CONNECTION_MODE and TRANSPORT == "udp":
+        sys.exit("HIGH_CONNECTION_MODE supports only the tcp and tls transports")
+    scenarios = load_scenarios()
+    batch = len(scenarios) > 1 or "scenario" in scenarios[0]
+    profiling_hooks.install_signal_handlers()
+
+    for index, scenario in enumerate(scenarios):
+        if index > 0:
+            # Pausa entre cenários para o servidor liberar as conexões do cenário anterior
+            time.sleep(SCENARIO_PAUSE_S)
+        if batch:
+            print(f"[{CLIENT_ID_BASE}] Scenario {index+1}/{len(scenarios)}: {scenario.get('scenario', '')}")
+        # Em lote, o índice do cenário entra no id para manter os ids únicos entre cenários
+        run_scenario(scenario, f"s{index}-" if batch else "")
@@ -1,12 +1,32 @@
 # generate_graphs.py
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
 import sys
+import argparse
 from glob import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 
+LANG_PALETTE = {"go": "#00ADD8", "cpp": "#f34b7d"}
+
+# Selecione alguns cenários chave para a análise de estabilidade. Pode customizar esta lista.
+KEY_SCENARIOS = [
+    {'server_replicas': 4, 'num_concurrent_clients_scenario': 100, 'num_messages_per_client_scenario': 100},
+    {'server_replicas': 8, 'num_concurrent_clients_scenario': 1000, 'num_messages_per_client_scenario': 10},
+    {'server_replicas': 10, 'num_concurrent_clients_scenario': 50, 'num_messages_per_client_scenario': 1000}
+]
+
+def _plotting_modules():
+    """
+    Importa matplotlib (com o backend não interativo Agg) e seaborn sob demanda.
+    Só os processos que desenham pagam o custo dessas importações.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
 def load_all_data(base_dir):
     """
     Carrega e concatena todos os arquivos 'results_combined.csv' de todos os subdiretórios 'run_*'.
@@ -15,173 +35,363 @@ def load_all_data(base_dir):
     if not all_csv_files:
         print(f"Erro: Nenhum arquivo 'results_combined.csv' encontrado em subdiretórios 'run_*' de '{base_dir}'", file=sys.stderr)
         sys.exit(1)
-    
+
     print(f"Encontrados {len(all_csv_files)} arquivos de resultado. Carregando...")
     df_list = [pd.read_csv(f) for f in all_csv_files]
     full_df = pd.concat(df_list, ignore_index=True)
-    
+
     numeric_cols = ['run_number', 'server_replicas', 'num_concurrent_clients_scenario', 'average_latency_ms', 'scenario_success_rate', 'total_messages_received']
     for col in numeric_cols:
         if col in full_df.columns:
             full_df[col] = pd.to_numeric(full_df[col], errors='coerce')
     full_df.dropna(subset=numeric_cols, inplace=True)
-    
+
     print(f"Dados carregados com sucesso. Total de {len(full_df)} cenários analisados (contando todas as execuções).")
     return full_df
 
-def remove_outliers(df, metric_col, group_cols):
+# Parâmetros dos resumos de distribuição usados nos boxplots e violinos
+KDE_BINS = 256
+MAX_FLIERS = 50
+
+def summarize_distribution(df, metric_col, group_cols, bins=KDE_BINS):
     """
-    Remove outliers de uma coluna de métrica com base no método IQR (Interquartile Range).
+    Reduz cada grupo de `group_cols` a um resumo de tamanho fixo da distribuição de `metric_col`,
+    em uma única passada vetorizada sobre as linhas:
+      - estatísticas de boxplot (quartis, bigodes a 1,5 IQR e no máximo MAX_FLIERS outliers representativos);
+      - histograma dos valores sem outliers sobre bordas comuns a todos os grupos, mais contagem,
+        soma e soma dos quadrados. Esses campos são somáveis, então resumos finos podem ser
+        mesclados em grupos mais grossos (ver merge_histograms) sem voltar às linhas.
+    O desenho passa a depender só do número de grupos, não do número de linhas.
     """
-    q1 = df.groupby(group_cols)[metric_col].transform('quantile', 0.25)
-    q3 = df.groupby(group_cols)[metric_col].transform('quantile', 0.75)
+    values = df[metric_col].to_numpy(dtype=float)
+    codes, groups = pd.factorize(pd.MultiIndex.from_frame(df[group_cols]), sort=True)
+    n_groups = len(groups)
+
+    quartiles = pd.Series(values).groupby(codes).quantile([.25, .5, .75]).unstack().to_numpy()
+    q1, med, q3 = quartiles[:, 0], quartiles[:, 1], quartiles[:, 2]
     iqr = q3 - q1
-    lower_bound = q1 - 1.5 * iqr
-    upper_bound = q3 + 1.5 * iqr
-    
-    return df[(df[metric_col] >= lower_bound) & (df[metric_col] <= upper_bound)]
+    lower, upper = (q1 - 1.5 * iqr)[codes], (q3 + 1.5 * iqr)[codes]
+    inlier = (values >= lower) & (values <= upper)
+
+    series = pd.Series(values)
+    by_group = series.where(inlier).groupby(codes)
+    whislo, whishi = by_group.min().to_numpy(), by_group.max().to_numpy()
+    means = series.groupby(codes).mean().to_numpy()
+
+    # Outliers: quantis igualmente espaçados dos valores fora dos bigodes, limitados a MAX_FLIERS por grupo
+    fliers = [np.array([])] * n_groups
+    outliers = series[~inlier]
+    if not outliers.empty:
+        flier_q = outliers.groupby(codes[~inlier]).quantile(np.linspace(0, 1, MAX_FLIERS))
+        for code, group_fliers in flier_q.groupby(level=0):
+            fliers[code] = np.unique(group_fliers.to_numpy())
+
+    # As bordas cobrem só a faixa dos bigodes: com min..max de todos os valores, um outlier distante
+    # espremeria os valores sem outliers (os únicos contados no histograma) em poucas faixas
+    edges = np.linspace(np.nanmin(whislo), np.nanmax(whishi), bins + 1)
+    bin_idx = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, bins - 1)
+    flat = codes * bins + bin_idx
+    hist = np.bincount(flat[inlier], minlength=n_groups * bins).reshape(n_groups, bins)
+    count = np.bincount(codes[inlier], minlength=n_groups)
+    total = np.bincount(codes[inlier], weights=values[inlier], minlength=n_groups)
+    total_sq = np.bincount(codes[inlier], weights=values[inlier] ** 2, minlength=n_groups)
+
+    summary = pd.DataFrame({
+        'q1': q1, 'med': med, 'q3': q3, 'whislo': whislo, 'whishi': whishi, 'mean': means,
+        'fliers': fliers, 'count': count, 'sum': total, 'sum_sq': total_sq, 'hist': list(hist),
+    }, index=groups)
+    summary.index.names = group_cols
+    summary.attrs['edges'] = edges
+    return summary
 
-def generate_all_graphs(df, output_dir):
+def merge_histograms(summary, group_cols):
+    """Mescla os histogramas e momentos de um resumo em grupos mais grossos (`group_cols`)."""
+    merged = summary.groupby(level=group_cols).agg(
+        count=('count', 'sum'), sum=('sum', 'sum'), sum_sq=('sum_sq', 'sum'),
+        hist=('hist', lambda h: np.sum(np.vstack(h.to_numpy()), axis=0)),
+    )
+    merged.attrs['edges'] = summary.attrs['edges']
+    return merged
+
+def kde_from_histogram(hist, edges, count, total, total_sq):
     """
-    Gera um conjunto abrangente de gráficos a partir do DataFrame consolidado.
+    Estima a densidade a partir de um histograma (KDE binada): suaviza as contagens com um
+    núcleo gaussiano de largura dada pela regra de Scott, calculada a partir dos momentos.
+    Retorna as coordenadas e a densidade restritas ao intervalo com dados.
     """
-    os.makedirs(output_dir, exist_ok=True)
-    lang_palette = {"go": "#00ADD8", "cpp": "#f34b7d"}
+    centers = (edges[:-1] + edges[1:]) / 2
+    bin_width = edges[1] - edges[0]
+    if count == 0 or bin_width == 0:
+        return centers[:1], np.zeros(1)
+    std = np.sqrt(max(total_sq / count - (total / count) ** 2, 0))
+    bandwidth = max(1.06 * std * count ** (-1 / 5), bin_width)
+    radius = int(np.ceil(3 * bandwidth / bin_width))
+    offsets = np.arange(-radius, radius + 1) * bin_width
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    density = np.convolve(hist, kernel / (kernel.sum() * bin_width * count), mode='same')
+    occupied = np.flatnonzero(hist)
+    lo, hi = occupied[0], occupied[-1] + 1
+    return centers[lo:hi], density[lo:hi]
 
-    # --- 1. Análise de Latência vs. Carga de Clientes (Distribuição) ---
-    print("Gerando gráficos (1/6): Latência vs. Carga de Clientes...")
-    df_no_outliers_latency = remove_outliers(df, 'average_latency_ms', ['num_concurrent_clients_scenario', 'language'])
-    
-    # Com Outliers
-    plt.figure(figsize=(20, 10))
-    sns.boxplot(data=df, x='num_concurrent_clients_scenario', y='average_latency_ms', hue='language', palette=lang_palette)
-    plt.title('Distribuição da Latência Média vs. Clientes Concorrentes (Com Outliers)', fontsize=16)
-    plt.xlabel('Número de Clientes Concorrentes', fontsize=12); plt.ylabel('Latência Média (ms)', fontsize=12)
-    plt.grid(axis='y', linestyle='--', alpha=0.7); plt.yscale('log')
-    plt.legend(title='Linguagem'); plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '1a_latency_vs_clients_with_outliers.png')); plt.close()
-
-    # Sem Outliers
-    plt.figure(figsize=(20, 10))
-    sns.boxplot(data=df_no_outliers_latency, x='num_concurrent_clients_scenario', y='average_latency_ms', hue='language', palette=lang_palette)
-    plt.title('Distribuição da Latência Média vs. Clientes Concorrentes (Sem Outliers)', fontsize=16)
-    plt.xlabel('Número de Clientes Concorrentes', fontsize=12); plt.ylabel('Latência Média (ms)', fontsize=12)
+def _box_stats(summary_row, show_fliers):
+    return {
+        'med': summary_row['med'], 'q1': summary_row['q1'], 'q3': summary_row['q3'],
+        'whislo': summary_row['whislo'], 'whishi': summary_row['whishi'], 'mean': summary_row['mean'],
+        'fliers': summary_row['fliers'] if show_fliers else np.array([]),
+    }
+
+# --- Funções de desenho: cada uma gera um arquivo e roda de forma independente ---
+
+def plot_boxplot(summary, x, title, xlabel, ylabel, output_path, show_fliers=True, log_scale=False, ylim_bottom=None, legend=True):
+    """Desenha boxplots agrupados por `x` e linguagem a partir de um resumo de summarize_distribution."""
+    plt, _ = _plotting_modules()
+    from matplotlib.patches import Patch
+
+    categories = sorted(summary.index.get_level_values(x).unique())
+    languages = sorted(summary.index.get_level_values('language').unique())
+    width = 0.8 / len(languages)
+
+    fig, ax = plt.subplots(figsize=(20, 10))
+    for j, lang in enumerate(languages):
+        stats, positions = [], []
+        for i, category in enumerate(categories):
+            if (category, lang) not in summary.index:
+                continue
+            stats.append(_box_stats(summary.loc[(category, lang)], show_fliers))
+            positions.append(i + (j - (len(languages) - 1) / 2) * width)
+        color = LANG_PALETTE.get(lang, 'gray')
+        ax.bxp(stats, positions=positions, widths=width * 0.9, patch_artist=True, showfliers=show_fliers,
+               boxprops=dict(facecolor=color), medianprops=dict(color='black'),
+               flierprops=dict(marker='d', markerfacecolor='gray', markersize=4))
+    ax.set_xticks(range(len(categories)))
+    ax.set_xticklabels([f"{c:g}" for c in categories])
+    plt.title(title, fontsize=16)
+    plt.xlabel(xlabel, fontsize=12); plt.ylabel(ylabel, fontsize=12)
+    if ylim_bottom is not None:
+        plt.ylim(bottom=ylim_bottom)
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    if log_scale:
+        plt.yscale('log')
+    if legend:
+        plt.legend(handles=[Patch(facecolor=LANG_PALETTE.get(l, 'gray'), label=l) for l in languages], title='Linguagem')
+    plt.tight_layout()
+    plt.savefig(output_path); plt.close(fig)
+
+def plot_violin(summary, output_path):
+    """Desenha violinos por linguagem a partir dos histogramas mesclados (sem outliers)."""
+    plt, _ = _plotting_modules()
+    edges = summary.attrs['edges']
+    languages = list(summary.index)
+
+    vpstats = []
+    for lang in languages:
+        row = summary.loc[lang]
+        coords, density = kde_from_histogram(row['hist'], edges, row['count'], row['sum'], row['sum_sq'])
+        cdf = np.cumsum(row['hist']) / max(row['count'], 1)
+        centers = (edges[:-1] + edges[1:]) / 2
+        vpstats.append({
+            'coords': coords, 'vals': density, 'mean': row['sum'] / max(row['count'], 1),
+            'median': centers[np.searchsorted(cdf, 0.5)], 'min': coords[0], 'max': coords[-1],
+        })
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+    parts = ax.violin(vpstats, positions=range(len(languages)), showmedians=True)
+    for body, lang in zip(parts['bodies'], languages):
+        body.set_facecolor(LANG_PALETTE.get(lang, 'gray')); body.set_alpha(0.8)
+    ax.set_xticks(range(len(languages)))
+    ax.set_xticklabels(languages)
+    plt.title('Distribuição Geral da Latência por Linguagem (Sem Outliers)', fontsize=16)
+    plt.xlabel('Linguagem', fontsize=12); plt.ylabel('Latência Média (ms)', fontsize=12)
     plt.grid(axis='y', linestyle='--', alpha=0.7); plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '1b_latency_vs_clients_no_outliers.png')); plt.close()
+    plt.savefig(output_path); plt.close(fig)
+
+def plot_heatmap(heatmap_data, lang, output_path):
+    plt, sns = _plotting_modules()
+    plt.figure(figsize=(14, 10))
+    sns.heatmap(heatmap_data, annot=True, fmt=".2f", cmap="viridis_r", linewidths=.5)
+    plt.title(f'Heatmap de Latência Média (ms) para {lang.upper()}', fontsize=16)
+    plt.xlabel('Número de Clientes Concorrentes', fontsize=12); plt.ylabel('Número de Réplicas do Servidor', fontsize=12)
+    plt.tight_layout()
+    plt.savefig(output_path); plt.close()
+
+def plot_run_stability(summary, title, ylabel, output_path, marker, linestyle, ylim=None):
+    """Desenha média e IC de 95% por execução e linguagem a partir de um resumo (run_number, language)."""
+    plt, _ = _plotting_modules()
+    runs = sorted(summary.index.get_level_values('run_number').unique())
+    positions = {run: i for i, run in enumerate(runs)}
+
+    fig, ax = plt.subplots(figsize=(16, 8))
+    for lang, lang_summary in summary.groupby(level='language'):
+        lang_summary = lang_summary.droplevel('language')
+        x = [positions[r] for r in lang_summary.index]
+        ax.errorbar(x, lang_summary['mean'], yerr=lang_summary['ci'].fillna(0), label=lang,
+                    color=LANG_PALETTE.get(lang, 'gray'), marker=marker, linestyle=linestyle, capsize=4)
+    # 'run_number' é tratado como categoria para o plot não interpolar entre execuções
+    ax.set_xticks(range(len(runs)))
+    ax.set_xticklabels([f"{r:g}" for r in runs])
+    plt.title(title, fontsize=16)
+    plt.xlabel('Número da Execução (Run)', fontsize=12); plt.ylabel(ylabel, fontsize=12)
+    if ylim is not None:
+        plt.ylim(*ylim)
+    plt.legend(title='language')
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    plt.savefig(output_path); plt.close(fig)
+
+def stability_summary(scenario_df, metric_col):
+    """Média e meia-largura do IC de 95% (aproximação normal) por execução e linguagem."""
+    grouped = scenario_df.groupby(['run_number', 'language'])[metric_col]
+    summary = grouped.agg(['mean', 'sem'])
+    summary['ci'] = 1.96 * summary['sem']
+    return summary
+
+def is_selected(job_id, only):
+    """Indica se o gráfico `job_id` está entre os prefixos de id informados (ex.: ['1', '5_go', '6a'])."""
+    return not only or any(job_id.startswith(prefix) for prefix in only)
+
+def build_plot_jobs(df, output_dir, only=None):
+    """
+    Monta a lista de gráficos como tarefas independentes (id, função, argumentos).
+    Os dados são reduzidos a resumos por grupo antes do envio, então cada tarefa
+    recebe um objeto cujo tamanho depende do número de grupos, não de linhas.
+    Só os gráficos selecionados por `only` entram na lista, e cada resumo é calculado
+    apenas se algum deles o usa (e uma única vez, se vários usam).
+    """
+    jobs = []
+    clients_label, servers_label = 'Número de Clientes Concorrentes', 'Número de Réplicas do Servidor'
+    latency_label = 'Latência Média (ms)'
+    selected = lambda job_id: is_selected(job_id, only)
+
+    summaries = {}
+    def distribution(metric_col, x):
+        if (metric_col, x) not in summaries:
+            summaries[(metric_col, x)] = summarize_distribution(df, metric_col, [x, 'language'])
+        return summaries[(metric_col, x)]
+
+    # --- 1. Análise de Latência vs. Carga de Clientes (Distribuição) ---
+    if selected('1a'):
+        jobs.append(('1a', plot_boxplot, dict(
+            summary=distribution('average_latency_ms', 'num_concurrent_clients_scenario'), x='num_concurrent_clients_scenario',
+            title='Distribuição da Latência Média vs. Clientes Concorrentes (Com Outliers)',
+            xlabel=clients_label, ylabel=latency_label, log_scale=True,
+            output_path=os.path.join(output_dir, '1a_latency_vs_clients_with_outliers.png'))))
+    if selected('1b'):
+        jobs.append(('1b', plot_boxplot, dict(
+            summary=distribution('average_latency_ms', 'num_concurrent_clients_scenario'), x='num_concurrent_clients_scenario',
+            show_fliers=False,
+            title='Distribuição da Latência Média vs. Clientes Concorrentes (Sem Outliers)',
+            xlabel=clients_label, ylabel=latency_label,
+            output_path=os.path.join(output_dir, '1b_latency_vs_clients_no_outliers.png'))))
 
     # --- 2. Análise da Taxa de Sucesso vs. Carga de Clientes ---
-    print("Gerando gráficos (2/6): Taxa de Sucesso vs. Carga de Clientes...")
-    plt.figure(figsize=(20, 10))
-    sns.boxplot(data=df, x='num_concurrent_clients_scenario', y='scenario_success_rate', hue='language', palette=lang_palette)
-    plt.title('Distribuição da Taxa de Sucesso vs. Clientes Concorrentes', fontsize=16)
-    plt.xlabel('Número de Clientes Concorrentes', fontsize=12); plt.ylabel('Taxa de Sucesso (%)', fontsize=12)
-    plt.ylim(bottom=-5); plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.legend(title='Linguagem'); plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '2_success_rate_vs_clients.png')); plt.close()
+    if selected('2'):
+        jobs.append(('2', plot_boxplot, dict(
+            summary=distribution('scenario_success_rate', 'num_concurrent_clients_scenario'), x='num_concurrent_clients_scenario',
+            title='Distribuição da Taxa de Sucesso vs. Clientes Concorrentes',
+            xlabel=clients_label, ylabel='Taxa de Sucesso (%)', ylim_bottom=-5,
+            output_path=os.path.join(output_dir, '2_success_rate_vs_clients.png'))))
 
     # --- 3. Análise de Desempenho vs. Escalabilidade do Servidor ---
-    print("Gerando gráficos (3/6): Desempenho vs. Réplicas do Servidor...")
-    df_no_outliers_servers = remove_outliers(df, 'average_latency_ms', ['server_replicas', 'language'])
-    
-    # Com Outliers
-    plt.figure(figsize=(20, 10))
-    sns.boxplot(data=df, x='server_replicas', y='average_latency_ms', hue='language', palette=lang_palette)
-    plt.title('Distribuição da Latência Média vs. Réplicas do Servidor (Com Outliers)', fontsize=16)
-    plt.xlabel('Número de Réplicas do Servidor', fontsize=12); plt.ylabel('Latência Média (ms)', fontsize=12)
-    plt.grid(axis='y', linestyle='--', alpha=0.7); plt.yscale('log')
-    plt.legend(title='Linguagem'); plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '3a_latency_vs_servers_with_outliers.png')); plt.close()
-
-    # Sem Outliers
-    plt.figure(figsize=(20, 10))
-    sns.boxplot(data=df_no_outliers_servers, x='server_replicas', y='average_latency_ms', hue='language', palette=lang_palette)
-    plt.title('Distribuição da Latência Média vs. Réplicas do Servidor (Sem Outliers)', fontsize=16)
-    plt.xlabel('Número de Réplicas do Servidor', fontsize=12); plt.ylabel('Latência Média (ms)', fontsize=12)
-    plt.grid(axis='y', linestyle='--', alpha=0.7); plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '3b_latency_vs_servers_no_outliers.png')); plt.close()
-    
+    if selected('3a'):
+        jobs.append(('3a', plot_boxplot, dict(
+            summary=distribution('average_latency_ms', 'server_replicas'), x='server_replicas',
+            title='Distribuição da Latência Média vs. Réplicas do Servidor (Com Outliers)',
+            xlabel=servers_label, ylabel=latency_label, log_scale=True,
+            output_path=os.path.join(output_dir, '3a_latency_vs_servers_with_outliers.png'))))
+    if selected('3b'):
+        jobs.append(('3b', plot_boxplot, dict(
+            summary=distribution('average_latency_ms', 'server_replicas'), x='server_replicas', show_fliers=False,
+            title='Distribuição da Latência Média vs. Réplicas do Servidor (Sem Outliers)',
+            xlabel=servers_label, ylabel=latency_label,
+            output_path=os.path.join(output_dir, '3b_latency_vs_servers_no_outliers.png'))))
+
     # --- 4. Comparação Geral de Performance (Go vs. C++) ---
-    print("Gerando gráficos (4/6): Comparação Geral de Performance...")
-    plt.figure(figsize=(12, 8))
-    sns.violinplot(data=df_no_outliers_latency, x='language', y='average_latency_ms', palette=lang_palette)
-    plt.title('Distribuição Geral da Latência por Linguagem (Sem Outliers)', fontsize=16)
-    plt.xlabel('Linguagem', fontsize=12); plt.ylabel('Latência Média (ms)', fontsize=12)
-    plt.grid(axis='y', linestyle='--', alpha=0.7); plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '4_overall_latency_distribution.png')); plt.close()
+    # Os histogramas sem outliers por (clientes, linguagem) são mesclados por linguagem
+    if selected('4'):
+        jobs.append(('4', plot_violin, dict(
+            summary=merge_histograms(distribution('average_latency_ms', 'num_concurrent_clients_scenario'), ['language']),
+            output_path=os.path.join(output_dir, '4_overall_latency_distribution.png'))))
 
     # --- 5. Heatmaps de Performance ---
-    print("Gerando gráficos (5/6): Heatmaps de Performance...")
-    for lang in df['language'].unique():
-        plt.figure(figsize=(14, 10))
-        heatmap_data = df[df['language'] == lang].pivot_table(index='server_replicas', columns='num_concurrent_clients_scenario', values='average_latency_ms', aggfunc='mean')
-        sns.heatmap(heatmap_data, annot=True, fmt=".2f", cmap="viridis_r", linewidths=.5)
-        plt.title(f'Heatmap de Latência Média (ms) para {lang.upper()}', fontsize=16)
-        plt.xlabel('Número de Clientes Concorrentes', fontsize=12); plt.ylabel('Número de Réplicas do Servidor', fontsize=12)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, f'5_heatmap_latency_{lang}.png')); plt.close()
-        
-    # --- 6. NOVO: Análise de Estabilidade Execução-a-Execução ---
-    print("Gerando gráficos (6/6): Análise de Estabilidade Execução-a-Execução...")
-
-    # Selecione alguns cenários chave para essa análise detalhada. Pode customizar esta lista.
-    key_scenarios = [
-        {'server_replicas': 4, 'num_concurrent_clients_scenario': 100, 'num_messages_per_client_scenario': 100},
-        {'server_replicas': 8, 'num_concurrent_clients_scenario': 1000, 'num_messages_per_client_scenario': 10},
-        {'server_replicas': 10, 'num_concurrent_clients_scenario': 50, 'num_messages_per_client_scenario': 1000}
-    ]
-
-    for i, scenario in enumerate(key_scenarios):
+    heatmap_langs = [lang for lang in sorted(df['language'].dropna().unique()) if selected(f'5_{lang}')]
+    if heatmap_langs:
+        heatmap_means = df.groupby(['language', 'server_replicas', 'num_concurrent_clients_scenario'])['average_latency_ms'].mean()
+        for lang in heatmap_langs:
+            heatmap_data = heatmap_means.loc[lang].unstack('num_concurrent_clients_scenario')
+            jobs.append((f'5_{lang}', plot_heatmap, dict(
+                heatmap_data=heatmap_data, lang=lang,
+                output_path=os.path.join(output_dir, f'5_heatmap_latency_{lang}.png'))))
+
+    # --- 6. Análise de Estabilidade Execução-a-Execução ---
+    for i, scenario in enumerate(KEY_SCENARIOS):
+        want_latency, want_success = selected(f'6a_{i+1}'), selected(f'6b_{i+1}')
+        if not (want_latency or want_success):
+            continue
         scenario_df = df[
             (df['server_replicas'] == scenario['server_replicas']) &
             (df['num_concurrent_clients_scenario'] == scenario['num_concurrent_clients_scenario']) &
             (df['num_messages_per_client_scenario'] == scenario['num_messages_per_client_scenario'])
-        ].copy()
+        ]
 
         if scenario_df.empty:
             print(f"Aviso: Nenhum dado encontrado para o cenário chave: {scenario}. Pulando gráfico.")
             continue
-        
-        # Garante que 'run_number' é tratado como categoria para o plot não tentar interpolar
-        scenario_df['run_number'] = scenario_df['run_number'].astype('category')
-        
-        # Gráfico para Latência
-        plt.figure(figsize=(16, 8))
-        sns.pointplot(data=scenario_df, x='run_number', y='average_latency_ms', hue='language', palette=lang_palette, markers='o', linestyles='-')
-        title_str = (f"Latência Execução-a-Execução (Cenário Chave {i+1})\n"
-                     f"({scenario['server_replicas']} Servidores, {scenario['num_concurrent_clients_scenario']} Clientes, "
-                     f"{scenario['num_messages_per_client_scenario']} Mensagens)")
-        plt.title(title_str, fontsize=16)
-        plt.xlabel('Número da Execução (Run)', fontsize=12); plt.ylabel('Latência Média (ms)', fontsize=12)
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        filename = f"6a_run_stability_latency_scenario{i+1}.png"
-        plt.savefig(os.path.join(output_dir, filename)); plt.close()
-        
-        # Gráfico para Taxa de Sucesso
-        plt.figure(figsize=(16, 8))
-        sns.pointplot(data=scenario_df, x='run_number', y='scenario_success_rate', hue='language', palette=lang_palette, markers='X', linestyles='--')
-        title_str = (f"Taxa de Sucesso Execução-a-Execução (Cenário Chave {i+1})\n"
-                     f"({scenario['server_replicas']} Servidores, {scenario['num_concurrent_clients_scenario']} Clientes, "
-                     f"{scenario['num_messages_per_client_scenario']} Mensagens)")
-        plt.title(title_str, fontsize=16)
-        plt.xlabel('Número da Execução (Run)', fontsize=12); plt.ylabel('Taxa de Sucesso (%)', fontsize=12)
-        plt.ylim(50, 105) # Foco na faixa de sucesso alta
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        filename = f"6b_run_stability_success_scenario{i+1}.png"
-        plt.savefig(os.path.join(output_dir, filename)); plt.close()
+
+        scenario_desc = (f"({scenario['server_replicas']} Servidores, {scenario['num_concurrent_clients_scenario']} Clientes, "
+                         f"{scenario['num_messages_per_client_scenario']} Mensagens)")
+        if want_latency:
+            jobs.append((f'6a_{i+1}', plot_run_stability, dict(
+                summary=stability_summary(scenario_df, 'average_latency_ms'),
+                title=f"Latência Execução-a-Execução (Cenário Chave {i+1})\n{scenario_desc}",
+                ylabel=latency_label, marker='o', linestyle='-',
+                output_path=os.path.join(output_dir, f"6a_run_stability_latency_scenario{i+1}.png"))))
+        if want_success:
+            jobs.append((f'6b_{i+1}', plot_run_stability, dict(
+                summary=stability_summary(scenario_df, 'scenario_success_rate'),
+                title=f"Taxa de Sucesso Execução-a-Execução (Cenário Chave {i+1})\n{scenario_desc}",
+                ylabel='Taxa de Sucesso (%)', marker='X', linestyle='--', ylim=(50, 105),  # Foco na faixa de sucesso alta
+                output_path=os.path.join(output_dir, f"6b_run_stability_success_scenario{i+1}.png"))))
+
+    return jobs
+
+def generate_all_graphs(df, output_dir, only=None, workers=None):
+    """
+    Gera um conjunto abrangente de gráficos a partir do DataFrame consolidado.
+    Os gráficos são renderizados em paralelo em um pool de processos; `only` restringe
+    a geração a um subconjunto de ids e `workers=1` desenha tudo no processo atual.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = build_plot_jobs(df, output_dir, only)
+    if not jobs:
+        print("Aviso: Nenhum gráfico corresponde à seleção informada.", file=sys.stderr)
+        return
+
+    print(f"Gerando {len(jobs)} gráficos...")
+    if workers == 1:
+        for i, (job_id, func, kwargs) in enumerate(jobs, 1):
+            func(**kwargs)
+            print(f"  ({i}/{len(jobs)}) {os.path.basename(kwargs['output_path'])}")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(func, **kwargs): kwargs['output_path'] for _, func, kwargs in jobs}
+            for i, future in enumerate(as_completed(futures), 1):
+                future.result()
+                print(f"  ({i}/{len(jobs)}) {os.path.basename(futures[future])}")
 
     print("\n--- Geração de gráficos concluída! ---")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Uso: python3 generate_graphs.py <base_logs_dir> <output_graphs_dir>", file=sys.stderr)
-        print("Ex: python3 generate_graphs.py logs logs/final_graphs", file=sys.stderr)
-        sys.exit(1)
-    
-    base_logs_dir = sys.argv[1]
-    output_dir = sys.argv[2]
-    
-    full_dataframe = load_all_data(base_logs_dir)
+    parser = argparse.ArgumentParser(
+        description="Gera os gráficos agregados de todas as execuções.",
+        epilog="Ex: python3 generate_graphs.py logs logs/final_graphs --only 1,5")
+    parser.add_argument('base_logs_dir', help="Diretório base com os subdiretórios 'run_*'")
+    parser.add_argument('output_graphs_dir', help="Diretório de saída dos gráficos")
+    parser.add_argument('--only', type=lambda s: [p for p in s.split(',') if p],
+                        help="Lista de prefixos de gráficos a gerar, separados por vírgula (ex.: 1,3b,5_go,6a)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Número de processos de renderização (padrão: número de CPUs; 1 desenha no processo atual)")
+    args = parser.parse_args()
+
+    full_dataframe = load_all_data(args.base_logs_dir)
     if not full_dataframe.empty:
-        generate_all_graphs(full_dataframe, output_dir)
\ No newline at end of file
+        generate_all_graphs(full_dataframe, args.output_graphs_dir, args.only, args.workers)
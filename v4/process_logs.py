@@ -2,68 +2,127 @@
 import os
 import sys
 import json
+import base64
 import pandas as pd
 import re
 
-def process_raw_logs(input_dir, output_csv_path):
-    all_data = []
-    run_match = re.search(r'run_(\d+)', input_dir)
-    run_number = int(run_match.group(1)) if run_match else 0
-    
-    if not os.path.isdir(input_dir):
-        print(f"Aviso: Diretório de logs brutos não encontrado: {input_dir}", file=sys.stderr)
-        pd.DataFrame().to_csv(output_csv_path, index=False)
-        return
+# Regex para extrair parâmetros do nome do arquivo de forma robusta
+# Ex: client_raw_log_go-2s-10c-100m.json
+LOG_FILE_PATTERN = re.compile(
+    r"client_raw_log_"
+    r"(?P<lang>[a-z]+)-"
+    r"(?P<servers>\d+)s-"
+    r"(?P<clients>\d+)c-"
+    r"(?P<messages>\d+)m"
+    r"\.json$"
+)
+
+def print_warning(message):
+    print(message, file=sys.stderr)
+
+def read_log_file(filepath, params, run_number, warn=print_warning):
+    """Lê as linhas JSON de um log bruto de cliente e anexa os parâmetros do cenário."""
+    entries = []
+    filename = os.path.basename(filepath)
+    with open(filepath, 'r') as f:
+        for line in f:
+            try:
+                if not line.strip().startswith('{'): continue
+
+                log_entry = json.loads(line.strip())
+                # Perfis (profiling.py) não são resultados; extract_profiles os grava em arquivos
+                if log_entry.get("type") == "profile":
+                    continue
+
+                log_entry["run_number"] = run_number
+                log_entry["server_replicas"] = int(params['servers'])
+                # Registros de lotes (client.py com SCENARIOS) já trazem os rótulos do cenário
+                log_entry.setdefault("num_concurrent_clients_scenario", int(params['clients']))
+                log_entry.setdefault("num_messages_per_client_scenario", int(params['messages']))
+                log_entry.pop("scenario", None)
+
+                entries.append(log_entry)
+            except json.JSONDecodeError:
+                # Este aviso é útil para saber se um arquivo de log está corrompido
+                warn(f"Aviso: Pulando linha com JSON mal formatado em {filename}")
+    return entries
+
+def extract_profiles(filepath):
+    """
+    Grava cada registro 'type': 'profile' de um log (cliente ou server_samples) em um arquivo ao lado
+    dele, rotulado com o cenário do nome do log: profile_<cenário>_<papel>_<pod>_<modo>.<extensão>.
+    Os perfis 'cprofile' (.prof) abrem com pstats/snakeviz e os 'sample' (.collapsed) com flamegraph.pl/speedscope.
+    """
+    directory, filename = os.path.split(filepath)
+    label = re.sub(r"^(client_raw_log_|server_samples_)", "", filename.split(".")[0])
+    written = []
+    with open(filepath, 'r') as f:
+        for line in f:
+            if '"type": "profile"' not in line:
+                continue
+            try:
+                profile = json.loads(line.strip())
+            except json.JSONDecodeError:
+                continue
+            scenario = profile.get("scenario", label)
+            name = f"profile_{scenario}_{profile['role']}_{profile['pod']}_{profile['kind']}"
+            path = os.path.join(directory, f"{name}.{profile['extension']}")
+            index = 1
+            while path in written:
+                index += 1
+                path = os.path.join(directory, f"{name}_{index}.{profile['extension']}")
+            with open(path, 'wb') as out:
+                out.write(base64.b64decode(profile["data"]))
+            written.append(path)
+    return written
 
-    # Regex para extrair parâmetros do nome do arquivo de forma robusta
-    # Ex: client_raw_log_go-2s-10c-100m.json
-    log_file_pattern = re.compile(
-        r"client_raw_log_"
-        r"(?P<lang>[a-z]+)-"
-        r"(?P<servers>\d+)s-"
-        r"(?P<clients>\d+)c-"
-        r"(?P<messages>\d+)m"
-        r"\.json$"
+def language_from_id(client_id):
+    return client_id.split('-')[2] if len(client_id.split('-')) > 2 else 'unknown'
+
+def aggregate_client_summaries(summaries, group_cols):
+    """
+    Agrega os resumos de saturação do gerador de carga ('type': 'client_summary', emitidos pelo
+    client.py) em uma linha por cenário. Um cenário é marcado como saturado se qualquer pod estiver.
+    """
+    df = pd.DataFrame(summaries)
+    df['language'] = df['client_id'].apply(language_from_id)
+    aggregations = dict(
+        client_loop_lag_p99_ms=('loop_lag_p99_ms', 'max'),
+        client_cpu_pct=('cpu_pct', 'max'),
+        client_scheduling_delay_p99_ms=('scheduling_delay_p99_ms', 'max'),
+        client_saturated=('client_saturated', 'any'),
     )
+    # Presente só no modo de muitas conexões (HIGH_CONNECTION_MODE=1)
+    if 'memory_per_connection_bytes' in df:
+        aggregations['client_memory_per_connection_bytes'] = ('memory_per_connection_bytes', 'mean')
+    return df.groupby(group_cols).agg(**aggregations).reset_index()
 
-    for filename in os.listdir(input_dir):
-        match = log_file_pattern.match(filename)
-        # Se o nome do arquivo não corresponder ao padrão, pula para o próximo
-        if not match:
-            if filename.endswith(".json"): # Informa apenas sobre arquivos que poderiam ser logs
-                 print(f"Aviso: Pulando arquivo com nome fora do padrão esperado: {filename}", file=sys.stderr)
-            continue
-        
-        params = match.groupdict()
-        filepath = os.path.join(input_dir, filename)
-        
-        with open(filepath, 'r') as f:
-            for line in f:
-                try:
-                    if not line.strip().startswith('{'): continue
-                    
-                    log_entry = json.loads(line.strip())
-                    
-                    log_entry["run_number"] = run_number
-                    log_entry["server_replicas"] = int(params['servers'])
-                    log_entry["num_concurrent_clients_scenario"] = int(params['clients'])
-                    log_entry["num_messages_per_client_scenario"] = int(params['messages'])
-                    
-                    all_data.append(log_entry)
-                except json.JSONDecodeError:
-                    # Este aviso é útil para saber se um arquivo de log está corrompido
-                    print(f"Aviso: Pulando linha com JSON mal formatado em {filename}", file=sys.stderr)
-    
-    if not all_data:
-        print(f"Aviso: Nenhum dado de log válido encontrado em {input_dir}", file=sys.stderr)
-        pd.DataFrame().to_csv(output_csv_path, index=False)
-        return
+def aggregate_transport_metrics(df, group_cols):
+    """
+    Métricas específicas do transporte (client.py com TRANSPORT): tempo médio de conexão/handshake,
+    taxa de retomada de sessão TLS e perda de datagramas UDP. Colunas ausentes no log ficam de fora.
+    """
+    grouped = df.groupby(group_cols)
+    metrics = grouped['transport'].first().to_frame()
+    if 'handshake_ms' in df:
+        metrics['handshake_mean_ms'] = grouped['handshake_ms'].mean()
+    if 'tls_resumed' in df:
+        metrics['tls_resumption_rate'] = grouped['tls_resumed'].apply(lambda x: x.dropna().astype(bool).mean() * 100)
+    if 'datagrams_lost' in df:
+        sent = df['messages_sent'].where(df['datagrams_lost'].notna(), 0).groupby([df[c] for c in group_cols]).sum()
+        lost = grouped['datagrams_lost'].sum(min_count=1)
+        # Cenários sem nenhum registro de datagramas (TCP/TLS) ficam NaN, não com perda 0
+        metrics['datagram_loss_pct'] = lost / sent.where(sent > 0) * 100
+    return metrics.reset_index()
 
-    df = pd.DataFrame(all_data)
+def aggregate_log_entries(all_data):
+    """Agrega as entradas por conexão em uma linha por cenário."""
+    summaries = [e for e in all_data if e.get('type') == 'client_summary']
+    df = pd.DataFrame([e for e in all_data if e.get('type') != 'client_summary'])
     group_cols = ['run_number', 'language', 'server_replicas', 'num_concurrent_clients_scenario', 'num_messages_per_client_scenario']
-    
+
     # Adiciona a coluna 'language' ao DataFrame para agrupamento correto
-    df['language'] = df['client_full_id'].apply(lambda x: x.split('-')[2] if len(x.split('-')) > 2 else 'unknown')
+    df['language'] = df['client_full_id'].apply(language_from_id)
 
     aggregated_df = df.groupby(group_cols).agg(
         total_connections_attempted=('client_full_id', 'count'),
@@ -81,13 +140,74 @@ def process_raw_logs(input_dir, output_csv_path):
         lambda row: (row['total_messages_received'] / row['total_messages_sent']) * 100 if row['total_messages_sent'] > 0 else 0,
         axis=1
     )
-    
+
+    # Clientes que não informam o transporte (Go/C++) ficam sem essas colunas
+    if 'transport' in df:
+        aggregated_df = aggregated_df.merge(aggregate_transport_metrics(df, group_cols), on=group_cols, how='left')
+
+    # Clientes que não emitem resumo (Go/C++) ficam sem essas colunas
+    if summaries:
+        aggregated_df = aggregated_df.merge(aggregate_client_summaries(summaries, group_cols), on=group_cols, how='left')
+    return aggregated_df
+
+def process_log_file(filepath, run_number=0, warn=print_warning):
+    """
+    Processa um único log bruto de cenário e retorna sua linha agregada (dict),
+    ou None se o nome estiver fora do padrão ou o log não tiver dados válidos.
+    """
+    match = LOG_FILE_PATTERN.match(os.path.basename(filepath))
+    if not match or not os.path.exists(filepath):
+        return None
+    entries = read_log_file(filepath, match.groupdict(), run_number, warn)
+    extract_profiles(filepath)
+    if not entries:
+        return None
+    return aggregate_log_entries(entries).iloc[0].to_dict()
+
+def process_raw_logs(input_dir, output_csv_path, log=print, warn=print_warning):
+    """
+    Agrega os logs brutos de um diretório em um CSV. `log` e `warn` recebem as mensagens de
+    progresso e os avisos (ex: o logger com trava do scheduler.py, que roda linguagens em paralelo).
+    """
+    all_data = []
+    run_match = re.search(r'run_(\d+)', input_dir)
+    run_number = int(run_match.group(1)) if run_match else 0
+
+    if not os.path.isdir(input_dir):
+        warn(f"Aviso: Diretório de logs brutos não encontrado: {input_dir}")
+        pd.DataFrame().to_csv(output_csv_path, index=False)
+        return
+
+    for filename in os.listdir(input_dir):
+        match = LOG_FILE_PATTERN.match(filename)
+        # Se o nome do arquivo não corresponder ao padrão, pula para o próximo
+        if not match:
+            if filename.endswith(".json"): # Informa apenas sobre arquivos que poderiam ser logs
+                 warn(f"Aviso: Pulando arquivo com nome fora do padrão esperado: {filename}")
+            continue
+
+        all_data.extend(read_log_file(os.path.join(input_dir, filename), match.groupdict(), run_number, warn))
+        extract_profiles(os.path.join(input_dir, filename))
+
+    if not all_data:
+        warn(f"Aviso: Nenhum dado de log válido encontrado em {input_dir}")
+        pd.DataFrame().to_csv(output_csv_path, index=False)
+        return
+
+    aggregated_df = aggregate_log_entries(all_data)
     aggregated_df.to_csv(output_csv_path, index=False)
-    print(f"Dados processados da execução {run_number} salvos em {output_csv_path}")
+    log(f"Dados processados da execução {run_number} salvos em {output_csv_path}")
 
 if __name__ == "__main__":
+    # Extração avulsa de perfis, ex: dos server_samples_*.jsonl recolhidos dos pods do servidor
+    if len(sys.argv) > 2 and sys.argv[1] == "--profiles":
+        for path in sys.argv[2:]:
+            for written in extract_profiles(path):
+                print(f"Perfil salvo em {written}")
+        sys.exit(0)
     if len(sys.argv) != 3:
         print("Uso: python3 process_logs.py <input_raw_log_dir> <output_csv_path>", file=sys.stderr)
+        print("     python3 process_logs.py --profiles <log> [<log> ...]", file=sys.stderr)
         sys.exit(1)
     
     process_raw_logs(sys.argv[1], sys.argv[2])
\ No newline at end of file
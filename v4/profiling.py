@@ -0,0 +1,183 @@
+# profiling.py
+"""
+Ganchos de profiling sob demanda, compartilhados pelo server.py e pelo client.py.
+
+Modos (PROFILE_MODE, ou o modo disparado por PROFILE_SIGNAL):
+  - 'sample': amostragem periódica das pilhas de todas as threads (baixo custo), no formato
+    "collapsed stacks" aceito por flamegraph.pl e speedscope;
+  - 'cprofile': cProfile determinístico da thread principal, para execuções curtas (arquivo pstats);
+  - 'tracemalloc': alocações por linha no fim da janela e diferença em relação ao início.
+
+O resultado sai como uma linha JSON {"type": "profile", ...} com o conteúdo em base64, no mesmo
+fluxo dos demais registros; o process_logs.py grava cada perfil em um arquivo ao lado do log bruto.
+"""
+import os
+import sys
+import json
+import time
+import base64
+import marshal
+import signal
+import socket
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "").lower()
+# Sinal que liga/desliga o profiling em tempo de execução (o segundo sinal encerra e emite o perfil)
+PROFILE_SIGNAL = getattr(signal, os.environ.get("PROFILE_SIGNAL", "SIGUSR2"))
+# Duração máxima de uma janela de profiling (0 = até ser desligado ou até o fim da execução)
+PROFILE_WINDOW_S = float(os.environ.get("PROFILE_WINDOW_S", 0))
+PROFILE_SAMPLE_INTERVAL_S = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_S", 0.005))
+PROFILE_TRACEMALLOC_FRAMES = int(os.environ.get("PROFILE_TRACEMALLOC_FRAMES", 10))
+PROFILE_TOP_N = int(os.environ.get("PROFILE_TOP_N", 50))
+
+MODES = ("sample", "cprofile", "tracemalloc")
+# Extensão do arquivo gravado para cada modo
+EXTENSIONS = {"sample": "collapsed", "cprofile": "prof", "tracemalloc": "txt"}
+
+class StackSampler:
+    """Amostra as pilhas de todas as threads (menos a própria) em uma thread à parte."""
+
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="profile-sampler", daemon=True)
+
+    @staticmethod
+    def collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.stacks[self.collapse(frame)] += 1
+            self.samples += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()).encode()
+
+class TracemallocWindow:
+    """Alocações vivas ao fim da janela, por linha, e o crescimento desde o início."""
+
+    def __init__(self, frames=PROFILE_TRACEMALLOC_FRAMES, top_n=PROFILE_TOP_N):
+        self.frames = frames
+        self.top_n = top_n
+        self.baseline = None
+
+    def start(self):
+        tracemalloc.start(self.frames)
+        self.baseline = tracemalloc.take_snapshot()
+
+    def stop(self):
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        snapshot, baseline = snapshot.filter_traces(filters), self.baseline.filter_traces(filters)
+        lines = [f"traced_current_bytes={current} traced_peak_bytes={peak}", "", f"# Top {self.top_n} por linha"]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:self.top_n]]
+        lines += ["", f"# Top {self.top_n} crescimentos desde o início da janela"]
+        lines += [str(stat) for stat in snapshot.compare_to(baseline, "lineno")[:self.top_n]]
+        return ("\n".join(lines) + "\n").encode()
+
+class DeterministicProfile:
+    """cProfile da thread que chamou start(); o resultado é o mesmo formato de Profile.dump_stats()."""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+PROFILERS = {"sample": StackSampler, "cprofile": DeterministicProfile, "tracemalloc": TracemallocWindow}
+
+class ProfilingHooks:
+    """
+    Liga o profiling por variável de ambiente (start_from_env) ou pelo sinal PROFILE_SIGNAL e emite
+    o perfil ao desligar, ao fim da janela PROFILE_WINDOW_S (via SIGALRM, para que o cProfile seja
+    desligado na thread principal) ou ao encerrar. `labels` é uma função que retorna os rótulos
+    anexados ao registro (ex: o cenário em execução).
+    """
+
+    def __init__(self, role, labels=dict, emit=print):
+        self.role = role
+        self.labels = labels
+        self.emit = emit
+        self.mode = None
+        self.profiler = None
+        self.started_at = None
+        self.alarm_installed = False
+        self.lock = threading.RLock()
+
+    def install_signal_handlers(self, mode=None):
+        """O sinal alterna o profiling no modo dado (padrão: PROFILE_MODE ou 'sample')."""
+        signal_mode = mode or PROFILE_MODE or "sample"
+        signal.signal(PROFILE_SIGNAL, lambda signum, frame: self.toggle(signal_mode))
+        signal.signal(signal.SIGALRM, lambda signum, frame: self.stop("window"))
+        self.alarm_installed = True
+
+    def start_from_env(self):
+        if PROFILE_MODE:
+            self.start(PROFILE_MODE)
+
+    def toggle(self, mode):
+        if self.profiler is None:
+            self.start(mode)
+        else:
+            self.stop("signal")
+
+    def start(self, mode):
+        if mode not in MODES:
+            raise ValueError(f"PROFILE_MODE inválido: {mode!r} (use {', '.join(MODES)})")
+        with self.lock:
+            if self.profiler is not None:
+                return
+            self.mode, self.profiler, self.started_at = mode, PROFILERS[mode](), time.time()
+            self.profiler.start()
+        # Sem o tratador de SIGALRM instalado, o alarme encerraria o processo
+        if PROFILE_WINDOW_S > 0 and self.alarm_installed and threading.current_thread() is threading.main_thread():
+            signal.setitimer(signal.ITIMER_REAL, PROFILE_WINDOW_S)
+
+    def stop(self, reason):
+        """Encerra a janela atual, se houver, e emite o perfil."""
+        with self.lock:
+            if self.profiler is None:
+                return
+            profiler, self.profiler = self.profiler, None
+            data = profiler.stop()
+        if self.alarm_installed and threading.current_thread() is threading.main_thread():
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        self.emit(json.dumps({
+            **self.labels(),
+            "type": "profile",
+            "role": self.role,
+            "kind": self.mode,
+            "extension": EXTENSIONS[self.mode],
+            "reason": reason,
+            "pod": socket.gethostname(),
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "finished_at": time.time(),
+            "data": base64.b64encode(data).decode("ascii"),
+        }), flush=True)
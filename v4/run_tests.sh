@@ -199,7 +199,7 @@ EOF
             done
         done
     done
-    
+
     # Limpa o deployment do servidor antes de passar para a próxima linguagem
     cleanup_kubernetes
 }
@@ -324,17 +324,16 @@ echo "Gerando gráficos agregados em $final_graph_dir..."
 python3 generate_graphs.py "$BASE_LOG_DIR" "$final_graph_dir"
 
 echo "Gerando relatório de análise agregado em $final_report..."
-# Nota: o script analyze_results.py precisaria ser modificado para
-# consolidar todos os 'results_combined.csv', similar ao generate_graphs.py,
-# ou podemos analisar o último 'run' como exemplo. Para simplificar,
-# vamos analisar os resultados combinados da última execução.
-last_run_combined_csv="$BASE_LOG_DIR/run_$TOTAL_RUNS/results_combined.csv"
-if [ -f "$last_run_combined_csv" ]; then
-    python3 analyze_results.py "$last_run_combined_csv" "$final_report"
-else
-    echo "AVISO: Não foi possível encontrar o CSV combinado da última execução para análise final."
-fi
+# Consolida todos os 'run_*/results_combined.csv' com ICs bootstrap e variância entre execuções
+python3 analyze_results.py "$BASE_LOG_DIR" "$final_report"
+
+scalability_report="$BASE_LOG_DIR/scalability_report.txt"
+echo "Ajustando modelos de escalabilidade (Amdahl/USL) em $scalability_report..."
+python3 analyze_results.py --scalability "$BASE_LOG_DIR" "$scalability_report"
 
+capacity_report="$BASE_LOG_DIR/capacity_report.txt"
+echo "Gerando tabela de capacidade por SLO em $capacity_report..."
+python3 analyze_results.py --capacity "$BASE_LOG_DIR" "$capacity_report"
 
 # 7. Limpeza final
 cleanup_kubernetes
@@ -0,0 +1,612 @@
+# scheduler.py
+# Agendador concorrente e retomável da matriz de testes (alternativa ao laço do run_tests.sh).
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from process_logs import process_raw_logs, process_log_file, extract_profiles
+
+# Mesmos padrões do run_tests.sh
+DEFAULT_DOCKER_USER = "kapelinsky"
+DEFAULT_LANGUAGES = ["go", "cpp"]
+DEFAULT_SERVER_REPLICAS = [2, 4, 6, 8, 10]
+DEFAULT_CLIENT_CONCURRENCY = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+DEFAULT_MESSAGES_PER_CLIENT = [1, 10, 100, 500, 1000, 10000]
+DEFAULT_TOTAL_RUNS = 10
+BASE_LOG_DIR = "logs"
+
+# Limites padrão da busca adaptativa de carga
+ADAPTIVE_MAX_LATENCY_MS = 5.0
+ADAPTIVE_MIN_SUCCESS_PCT = 99.0
+ADAPTIVE_BISECT_RESOLUTION = 5
+
+# Pausa entre cenários de um lote executado no mesmo pod (SCENARIO_PAUSE_S do client.py)
+BATCH_SCENARIO_PAUSE_S = 2
+
+# Transportes do server.py/client.py (TRANSPORT)
+TRANSPORTS = ("tcp", "tls", "udp")
+# Modelos de concorrência do server.py (SERVER_ENGINE); selectors e threads só falam TCP
+SERVER_ENGINES = ("asyncio", "selectors", "threads")
+# Modos do profiling.py (PROFILE_MODE)
+PROFILE_MODES = ("sample", "cprofile", "tracemalloc")
+
+# Sufixo das imagens por linguagem (a imagem Python não tem sufixo, como no test_build.sh)
+IMAGE_SUFFIX = {"go": "-go", "cpp": "-cpp", "python": ""}
+
+def image_names(docker_user, lang):
+    suffix = IMAGE_SUFFIX.get(lang, f"-{lang}")
+    return f"{docker_user}/tcp-server{suffix}:latest", f"{docker_user}/tcp-client{suffix}:latest"
+
+def scenario_desc(lang, num_servers, num_clients, num_messages):
+    return f"{lang}-{num_servers}s-{num_clients}c-{num_messages}m"
+
+def scenario_timeout(num_clients, num_messages):
+    """Timeout dinâmico do Job, igual ao do run_tests.sh (máximo de 10 min)."""
+    return min((num_clients * num_messages) // 10 + 120, 600)
+
+def client_job_manifest(job_name, namespace, scenario, client_image, num_clients, num_messages, batch=None,
+                        transport="tcp", profile_mode=None):
+    """
+    Manifesto do Job de cliente. Com `batch` (lista de cenários), o pod executa todos os
+    cenários em sequência via variável SCENARIOS do client.py.
+    """
+    env = [
+        {"name": "SERVER_IP", "value": "server-service"},
+        {"name": "SERVER_PORT", "value": "8080"},
+        {"name": "CLIENT_ID", "valueFrom": {"fieldRef": {"fieldPath": "metadata.name"}}},
+        {"name": "NUM_CONCURRENT_CLIENTS", "value": str(num_clients)},
+        {"name": "NUM_MESSAGES_PER_CLIENT", "value": str(num_messages)},
+    ]
+    if batch:
+        env.append({"name": "SCENARIOS", "value": json.dumps(batch)})
+        env.append({"name": "SCENARIO_PAUSE_S", "value": str(BATCH_SCENARIO_PAUSE_S)})
+    if transport != "tcp":
+        env.append({"name": "TRANSPORT", "value": transport})
+    if profile_mode:
+        env.append({"name": "PROFILE_MODE", "value": profile_mode})
+    return {
+        "apiVersion": "batch/v1",
+        "kind": "Job",
+        "metadata": {"name": job_name, "namespace": namespace, "labels": {"app": "client", "scenario": scenario}},
+        "spec": {
+            "backoffLimit": 0,
+            "ttlSecondsAfterFinished": 300,  # Limpa o Job automaticamente após 5 minutos
+            "template": {"spec": {
+                "restartPolicy": "Never",
+                "containers": [{
+                    "name": "client",
+                    "image": client_image,
+                    "env": env,
+                }],
+            }},
+        },
+    }
+
+# --- Backends de cluster ---
+
+class KubectlBackend:
+    """Executa as operações no cluster via kubectl, cada linguagem em seu próprio namespace."""
+
+    def __init__(self, deployment_file="server-deployment.yaml"):
+        self.deployment_file = deployment_file
+
+    def _kubectl(self, namespace, *args, input_text=None, check=True, timeout=None):
+        cmd = ["kubectl", "--namespace", namespace, *args]
+        result = subprocess.run(cmd, input=input_text, capture_output=True, text=True, timeout=timeout)
+        if check and result.returncode != 0:
+            raise RuntimeError(f"Falha em '{' '.join(cmd)}': {result.stderr.strip()}")
+        return result
+
+    def prepare(self, namespace):
+        manifest = json.dumps({"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": namespace}})
+        self._kubectl(namespace, "apply", "-f", "-", input_text=manifest)
+        self._kubectl(namespace, "apply", "-f", self.deployment_file)
+
+    def deploy_server(self, namespace, server_image, replicas, server_env=None):
+        self._kubectl(namespace, "set", "image", "deployment/server-deployment", f"server={server_image}")
+        if server_env:
+            self._kubectl(namespace, "set", "env", "deployment/server-deployment",
+                          *(f"{name}={value}" for name, value in server_env.items()))
+        self._kubectl(namespace, "scale", "deployment/server-deployment", f"--replicas={replicas}")
+        result = self._kubectl(namespace, "wait", "--for=condition=Available", "deployment/server-deployment",
+                               "--timeout=300s", check=False)
+        if result.returncode != 0:
+            raise RuntimeError(f"O deployment 'server-deployment' não ficou pronto a tempo em '{namespace}'.")
+
+    def server_status(self, namespace):
+        pods = self._kubectl(namespace, "get", "pods", "-l", "app=server", "-o", "wide", check=False).stdout
+        deployment = self._kubectl(namespace, "describe", "deployment", "server-deployment", check=False).stdout
+        return f"--- STATUS EM {datetime.now()} ---\n{pods}\n{deployment}"
+
+    def server_samples(self, namespace, profiling=False):
+        """
+        Pede a cada pod do servidor (SIGUSR1) o despejo das amostras de recursos e as recolhe dos logs.
+        Com `profiling`, o SIGUSR2 encerra a janela de profiling em curso (emitindo o perfil) e um
+        segundo SIGUSR2 abre a próxima, para a configuração de réplicas seguinte.
+        """
+        pods = self._kubectl(namespace, "get", "pods", "-l", "app=server",
+                             "-o", "jsonpath={.items[*].metadata.name}", check=False).stdout.split()
+        command = "kill -USR1 1; kill -USR2 1; sleep 1; kill -USR2 1" if profiling else "kill -USR1 1"
+        for pod in pods:
+            self._kubectl(namespace, "exec", pod, "--", "sh", "-c", command, check=False)
+        time.sleep(1)
+        lines = []
+        for pod in pods:
+            logs = self._kubectl(namespace, "logs", pod, check=False).stdout.splitlines()
+            for record_type in ("server_samples", "profile") if profiling else ("server_samples",):
+                dumps = [line for line in logs if f'"type": "{record_type}"' in line]
+                if dumps:
+                    lines.append(dumps[-1])
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def run_client_job(self, namespace, job_name, manifest, timeout):
+        self._kubectl(namespace, "delete", "job", "-l", f"scenario={manifest['metadata']['labels']['scenario']}",
+                      "--ignore-not-found", "--wait=false", check=False)
+        self._kubectl(namespace, "apply", "-f", "-", input_text=json.dumps(manifest))
+        waited = self._kubectl(namespace, "wait", "--for=condition=complete", f"job/{job_name}",
+                               f"--timeout={timeout}s", check=False)
+        pod = self._kubectl(namespace, "get", "pods", "-l", f"job-name={job_name}",
+                            "-o", "jsonpath={.items[0].metadata.name}", check=False).stdout.strip()
+        logs = self._kubectl(namespace, "logs", pod, check=False).stdout if pod else ""
+        return waited.returncode == 0, logs
+
+    def cleanup(self, namespace):
+        self._kubectl(namespace, "delete", "deployment", "server-deployment", "--ignore-not-found", "--wait=false", check=False)
+        self._kubectl(namespace, "delete", "service", "server-service", "--ignore-not-found", "--wait=false", check=False)
+        self._kubectl(namespace, "delete", "jobs", "-l", "app=client", "--ignore-not-found", "--wait=false", check=False)
+
+class FakeBackend:
+    """
+    Backend local sem cluster: simula o deployment e gera logs de cliente sintéticos no mesmo
+    formato do client.py, para exercitar o agendador, a retomada e o processamento de logs.
+    """
+
+    def __init__(self, delay=0.0, failure_rate=0.0, seed=None):
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.replicas = {}
+
+    def prepare(self, namespace):
+        pass
+
+    def deploy_server(self, namespace, server_image, replicas, server_env=None):
+        self.replicas[namespace] = replicas
+
+    def server_status(self, namespace):
+        return f"--- STATUS EM {datetime.now()} ---\nfake: {self.replicas.get(namespace, 0)} réplicas em {namespace}\n"
+
+    def server_samples(self, namespace, profiling=False):
+        return ""
+
+    def run_client_job(self, namespace, job_name, manifest, timeout):
+        env = {e["name"]: e.get("value") for e in manifest["spec"]["template"]["spec"]["containers"][0]["env"]}
+        if "SCENARIOS" in env:
+            scenarios = json.loads(env["SCENARIOS"])
+        else:
+            scenarios = [{"num_concurrent_clients": int(env["NUM_CONCURRENT_CLIENTS"]),
+                          "num_messages_per_client": int(env["NUM_MESSAGES_PER_CLIENT"])}]
+        replicas = self.replicas.get(namespace, 1)
+        with self.lock:
+            failed = self.rng.random() < self.failure_rate
+            jitter = [self.rng.uniform(0.8, 1.2) for _ in range(sum(s["num_concurrent_clients"] for s in scenarios))]
+        time.sleep(self.delay)
+
+        lines = []
+        for index, scenario in enumerate(scenarios):
+            num_clients, num_messages = scenario["num_concurrent_clients"], scenario["num_messages_per_client"]
+            labels = {}
+            if "scenario" in scenario:
+                labels = {"scenario": scenario["scenario"], "num_concurrent_clients_scenario": num_clients,
+                          "num_messages_per_client_scenario": num_messages}
+            lines.append(f"[{job_name}] Starting {num_clients} concurrent client tasks, each sending {num_messages} messages.")
+            for i in range(num_clients):
+                latency = (0.2 + 0.02 * num_clients / replicas) * jitter.pop()
+                lines.append(json.dumps({
+                    **labels,
+                    "client_full_id": f"{job_name}-fake-s{index}-{i}",
+                    "server_ip": "server-service", "server_port": 8080,
+                    "messages_sent": num_messages, "messages_received": num_messages,
+                    "connection_success": True,
+                    "total_latency_ms": latency * num_messages, "errors": [],
+                    "average_latency_ms": latency,
+                }))
+            lines.append(json.dumps({**labels, "type": "client_summary", "client_id": job_name,
+                                     "loop_lag_p99_ms": 0.1, "cpu_pct": 10.0, "scheduling_delay_p99_ms": 0.1,
+                                     "client_saturated": False}))
+            lines.append(f"[{job_name}] All client tasks completed.")
+        if failed:
+            # Pod que morre ou excede o timeout no meio da saída: o último cenário fica incompleto
+            with self.lock:
+                lines = lines[:self.rng.randrange(len(lines))]
+        return not failed, "\n".join(lines) + "\n"
+
+    def cleanup(self, namespace):
+        self.replicas.pop(namespace, None)
+
+BACKENDS = {"kubectl": KubectlBackend, "fake": FakeBackend}
+
+# --- Estado persistente ---
+
+class SchedulerInterrupted(Exception):
+    """Levantada nas threads das linguagens quando o agendador foi interrompido (Ctrl-C)."""
+
+class SchedulerState:
+    """
+    Registro dos cenários já concluídos, gravado em JSON a cada atualização
+    (escrita atômica via arquivo temporário), para retomar a campanha após uma interrupção.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.completed = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.completed = json.load(f).get("completed", {})
+
+    @staticmethod
+    def key(run_number, scenario):
+        return f"run_{run_number}/{scenario}"
+
+    def is_done(self, run_number, scenario):
+        """Só cenários concluídos com sucesso são pulados; os que falharam são repetidos na retomada."""
+        return self.completed.get(self.key(run_number, scenario), {}).get("status") == "ok"
+
+    def count_done(self):
+        return sum(1 for entry in self.completed.values() if entry.get("status") == "ok")
+
+    def mark_done(self, run_number, scenario, status, **extra):
+        with self.lock:
+            self.completed[self.key(run_number, scenario)] = {
+                "status": status, "finished_at": datetime.now().isoformat(timespec="seconds"), **extra}
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"completed": self.completed}, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+# --- Busca adaptativa ---
+
+class AdaptiveLimits:
+    """Limites que encerram a rampa de concorrência na busca adaptativa."""
+
+    def __init__(self, max_latency_ms=ADAPTIVE_MAX_LATENCY_MS, min_success_pct=ADAPTIVE_MIN_SUCCESS_PCT,
+                 bisect_resolution=ADAPTIVE_BISECT_RESOLUTION):
+        self.max_latency_ms = max_latency_ms
+        self.min_success_pct = min_success_pct
+        # Diferença máxima de clientes entre o último ponto aprovado e o primeiro reprovado (0 desliga a bisseção)
+        self.bisect_resolution = bisect_resolution
+
+    def passes(self, result):
+        """Um cenário passa se o Job concluiu e a latência e a taxa de sucesso estão dentro dos limites."""
+        return (result is not None
+                and result['scenario_success_rate'] >= self.min_success_pct
+                and result['average_latency_ms'] <= self.max_latency_ms)
+
+# --- Agendador ---
+
+class Scheduler:
+    def __init__(self, backend, state, languages, server_replicas, client_concurrency, messages_per_client,
+                 docker_user=DEFAULT_DOCKER_USER, base_log_dir=BASE_LOG_DIR, namespace_prefix="loadtest",
+                 adaptive=None, batch=False, transport="tcp", server_engine="asyncio",
+                 profile_mode=None):
+        self.backend = backend
+        self.state = state
+        self.languages = languages
+        self.server_replicas = server_replicas
+        self.client_concurrency = client_concurrency
+        self.messages_per_client = messages_per_client
+        self.docker_user = docker_user
+        self.base_log_dir = base_log_dir
+        self.namespace_prefix = namespace_prefix
+        # Configuração da busca adaptativa (AdaptiveLimits) ou None para a varredura completa
+        self.adaptive = adaptive
+        # Executa todos os cenários pendentes de um número de réplicas em um único pod de cliente
+        self.batch = batch
+        # Transporte do server.py/client.py: tcp, tls ou udp
+        self.transport = transport
+        # Modelo de concorrência do server.py: asyncio, selectors ou threads
+        self.server_engine = server_engine
+        # Modo do profiling.py ligado no servidor e no cliente (sample, cprofile, tracemalloc) ou None
+        self.profile_mode = profile_mode
+        self.print_lock = threading.Lock()
+        # Sinalizado no Ctrl-C; as threads das linguagens param antes do próximo cenário
+        self.stop_event = threading.Event()
+
+    def log(self, message):
+        with self.print_lock:
+            print(message, flush=True)
+
+    def check_stop(self):
+        if self.stop_event.is_set():
+            raise SchedulerInterrupted()
+
+    def scenarios(self):
+        for num_clients in self.client_concurrency:
+            for num_messages in self.messages_per_client:
+                yield num_clients, num_messages
+
+    def run_scenario(self, namespace, lang, run_number, num_servers, num_clients, num_messages, raw_log_dir):
+        """Executa um cenário como Job e grava o log bruto; retorna True se o Job concluiu."""
+        _, client_image = image_names(self.docker_user, lang)
+        desc = scenario_desc(lang, num_servers, num_clients, num_messages)
+        job_name = f"client-job-{desc}-{run_number}"
+        raw_log_file = os.path.join(raw_log_dir, f"client_raw_log_{desc}.json")
+        manifest = client_job_manifest(job_name, namespace, desc, client_image, num_clients, num_messages,
+                                       transport=self.transport, profile_mode=self.profile_mode)
+
+        self.check_stop()
+        self.log(f"[{namespace}] Cenário {desc} (execução {run_number})...")
+        started = time.monotonic()
+        succeeded, logs = self.backend.run_client_job(namespace, job_name, manifest,
+                                                      scenario_timeout(num_clients, num_messages))
+        # Um `kubectl wait` interrompido pelo Ctrl-C não é uma falha do cenário: fica pendente
+        if not succeeded:
+            self.check_stop()
+        with open(raw_log_file if succeeded else f"{raw_log_file}.failed", "w") as f:
+            f.write(logs)
+        if not succeeded:
+            self.log(f"AVISO: Job '{job_name}' falhou ou excedeu o timeout.")
+        self.state.mark_done(run_number, desc, "ok" if succeeded else "failed",
+                             duration_s=round(time.monotonic() - started, 3))
+        return succeeded
+
+    def run_batch(self, namespace, lang, run_number, num_servers, pending, raw_log_dir):
+        """
+        Executa os cenários `pending` de um número de réplicas em um único Job (client.py com
+        SCENARIOS) e separa a saída do pod em um log bruto por cenário, usando o rótulo 'scenario'.
+        """
+        _, client_image = image_names(self.docker_user, lang)
+        batch = [{"scenario": scenario_desc(lang, num_servers, c, m), "num_concurrent_clients": c,
+                  "num_messages_per_client": m} for c, m in pending]
+        job_name = f"client-batch-{lang}-{num_servers}s-{run_number}"
+        manifest = client_job_manifest(job_name, namespace, f"{lang}-{num_servers}s-batch", client_image,
+                                       pending[0][0], pending[0][1], batch=batch, transport=self.transport,
+                                       profile_mode=self.profile_mode)
+        timeout = sum(scenario_timeout(c, m) + BATCH_SCENARIO_PAUSE_S for c, m in pending)
+
+        self.check_stop()
+        self.log(f"[{namespace}] Lote de {len(batch)} cenário(s) com {num_servers} servidor(es) (execução {run_number})...")
+        started = time.monotonic()
+        succeeded, logs = self.backend.run_client_job(namespace, job_name, manifest, timeout)
+        if not succeeded:
+            self.check_stop()
+            self.log(f"AVISO: Job '{job_name}' falhou ou excedeu o timeout; cenários sem client_summary serão marcados como falhos.")
+
+        records = {entry["scenario"]: [] for entry in batch}
+        # O client.py emite o client_summary ao fim de cada cenário; sem ele, o cenário foi cortado
+        # (timeout ou pod encerrado) e os registros que sobraram são parciais
+        finished = set()
+        for line in logs.splitlines():
+            if not line.strip().startswith('{'):
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            label = record.get("scenario")
+            if label in records:
+                records[label].append(line)
+                if record.get("type") == "client_summary":
+                    finished.add(label)
+
+        duration = round(time.monotonic() - started, 3)
+        for desc, lines in records.items():
+            raw_log_file = os.path.join(raw_log_dir, f"client_raw_log_{desc}.json")
+            complete = desc in finished
+            with open(raw_log_file if complete else f"{raw_log_file}.failed", "w") as f:
+                f.write("\n".join(lines) + "\n" if lines else logs)
+            self.state.mark_done(run_number, desc, "ok" if complete else "failed", batch=job_name, batch_duration_s=duration)
+
+    def scenario_result(self, namespace, lang, run_number, num_servers, num_clients, num_messages, raw_log_dir):
+        """
+        Executa o cenário (se ainda não foi concluído) e devolve sua linha agregada pelo
+        process_logs, ou None se o Job falhou ou não produziu dados.
+        """
+        desc = scenario_desc(lang, num_servers, num_clients, num_messages)
+        if not self.state.is_done(run_number, desc):
+            self.run_scenario(namespace, lang, run_number, num_servers, num_clients, num_messages, raw_log_dir)
+        return process_log_file(os.path.join(raw_log_dir, f"client_raw_log_{desc}.json"), run_number, warn=self.log)
+
+    def search_capacity(self, namespace, lang, run_number, num_servers, num_messages, raw_log_dir):
+        """
+        Busca adaptativa: aumenta a concorrência passo a passo seguindo a lista de clientes e
+        para no primeiro cenário que viola os limites; então bissecta entre o último nível
+        aprovado e o reprovado até a resolução configurada. Retorna um resumo da capacidade.
+        """
+        limits = self.adaptive
+        run = lambda c: self.scenario_result(namespace, lang, run_number, num_servers, c, num_messages, raw_log_dir)
+
+        last_pass, first_fail, executed = None, None, 0
+        for num_clients in sorted(self.client_concurrency):
+            executed += 1
+            if limits.passes(run(num_clients)):
+                last_pass = num_clients
+            else:
+                first_fail = num_clients
+                break
+
+        if first_fail is not None and limits.bisect_resolution > 0:
+            low = last_pass if last_pass is not None else 0
+            high = first_fail
+            while high - low > limits.bisect_resolution:
+                mid = (low + high) // 2
+                executed += 1
+                if limits.passes(run(mid)):
+                    low = last_pass = mid
+                else:
+                    high = first_fail = mid
+
+        self.log(f"[{namespace}] Capacidade {lang} {num_servers}s {num_messages}m: "
+                 f"{last_pass if last_pass is not None else '<mínimo'} clientes aprovados, "
+                 f"primeira falha em {first_fail if first_fail is not None else '-'} ({executed} cenário(s))")
+        return {
+            'language': lang, 'server_replicas': num_servers, 'num_messages_per_client_scenario': num_messages,
+            'max_clients_within_limits': last_pass, 'first_clients_over_limits': first_fail,
+            'scenarios_executed': executed,
+        }
+
+    def run_language(self, lang, run_number):
+        """Executa a matriz de uma linguagem em uma execução, pulando cenários já concluídos."""
+        namespace = f"{self.namespace_prefix}-{lang}"
+        server_image, _ = image_names(self.docker_user, lang)
+        run_log_dir = os.path.join(self.base_log_dir, f"run_{run_number}")
+        raw_log_dir = os.path.join(run_log_dir, "raw_client_logs", lang)
+        os.makedirs(raw_log_dir, exist_ok=True)
+
+        prepared = False
+        capacity = []
+        try:
+            for num_servers in self.server_replicas:
+                self.check_stop()
+                pending = [(c, m) for c, m in self.scenarios()
+                           if not self.state.is_done(run_number, scenario_desc(lang, num_servers, c, m))]
+                # Na busca adaptativa nem todo cenário da grade será executado, então o
+                # servidor é sempre preparado e cenários já concluídos são reaproveitados
+                if not pending and not self.adaptive:
+                    continue
+                if not prepared:
+                    self.backend.prepare(namespace)
+                    prepared = True
+
+                self.log(f"--- [{namespace}] Testando com {num_servers} servidor(es) ({lang}), {len(pending)} cenário(s) pendente(s) ---")
+                self.backend.deploy_server(namespace, server_image, num_servers,
+                                          {"TRANSPORT": self.transport, "SERVER_ENGINE": self.server_engine,
+                                           "PROFILE_MODE": self.profile_mode or ""})
+                with open(os.path.join(run_log_dir, f"server_status_{lang}_{num_servers}s.log"), "w") as f:
+                    f.write(self.backend.server_status(namespace))
+
+                if self.adaptive:
+                    for num_messages in self.messages_per_client:
+                        capacity.append(self.search_capacity(namespace, lang, run_number, num_servers, num_messages, raw_log_dir))
+                elif self.batch:
+                    self.run_batch(namespace, lang, run_number, num_servers, pending, raw_log_dir)
+                else:
+                    for num_clients, num_messages in pending:
+                        self.run_scenario(namespace, lang, run_number, num_servers, num_clients, num_messages, raw_log_dir)
+
+                # Só o servidor Python trata SIGUSR1; nos demais o sinal encerraria o processo
+                if lang == "python":
+                    samples = self.backend.server_samples(namespace, profiling=bool(self.profile_mode))
+                    if samples:
+                        samples_file = os.path.join(run_log_dir, f"server_samples_{lang}_{num_servers}s.jsonl")
+                        with open(samples_file, "w") as f:
+                            f.write(samples)
+                        extract_profiles(samples_file)
+        finally:
+            if prepared:
+                self.backend.cleanup(namespace)
+
+        process_raw_logs(raw_log_dir, os.path.join(run_log_dir, f"results_{lang}.csv"), log=self.log, warn=self.log)
+        if capacity:
+            pd.DataFrame(capacity).to_csv(os.path.join(run_log_dir, f"adaptive_capacity_{lang}.csv"), index=False)
+
+    def combine_csvs(self, run_number):
+        """Combina os CSVs das linguagens de uma execução em results_combined.csv."""
+        run_log_dir = os.path.join(self.base_log_dir, f"run_{run_number}")
+        frames = []
+        for lang in self.languages:
+            csv_path = os.path.join(run_log_dir, f"results_{lang}.csv")
+            try:
+                frames.append(pd.read_csv(csv_path))
+            except (FileNotFoundError, pd.errors.EmptyDataError):
+                self.log(f"AVISO: CSV de {lang} não encontrado ou vazio para a execução {run_number}.")
+        if frames:
+            pd.concat(frames, ignore_index=True).to_csv(os.path.join(run_log_dir, "results_combined.csv"), index=False)
+
+    def run(self, total_runs, parallel=1):
+        """
+        Executa `total_runs` execuções completas. Dentro de uma execução, até `parallel`
+        linguagens rodam ao mesmo tempo, cada uma isolada em seu namespace.
+        """
+        for run_number in range(1, total_runs + 1):
+            self.log(f"\n=== EXECUÇÃO {run_number} de {total_runs} ===")
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                futures = {executor.submit(self.run_language, lang, run_number): lang for lang in self.languages}
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                except KeyboardInterrupt:
+                    # O Ctrl-C só chega à thread principal: as linguagens em andamento param antes do
+                    # próximo cenário e as que ainda não começaram são descartadas
+                    self.stop_event.set()
+                    for future in futures:
+                        future.cancel()
+                    self.log("Interrompendo: aguardando as linguagens em andamento liberarem o cluster...")
+                    raise
+            self.combine_csvs(run_number)
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agendador concorrente e retomável da matriz de testes de carga.")
+    parser.add_argument("-u", "--docker-user", default=DEFAULT_DOCKER_USER, help="Usuário do Docker Hub")
+    parser.add_argument("-l", "--languages", type=lambda s: [v for v in s.split(",") if v], default=DEFAULT_LANGUAGES,
+                        help="Linguagens separadas por vírgula (padrão: go,cpp)")
+    parser.add_argument("-s", "--server-replicas", type=_int_list, default=DEFAULT_SERVER_REPLICAS)
+    parser.add_argument("-c", "--client-concurrency", type=_int_list, default=DEFAULT_CLIENT_CONCURRENCY)
+    parser.add_argument("-m", "--messages-per-client", type=_int_list, default=DEFAULT_MESSAGES_PER_CLIENT)
+    parser.add_argument("-r", "--runs", type=int, default=DEFAULT_TOTAL_RUNS, help="Número de execuções completas")
+    parser.add_argument("-p", "--parallel", type=int, default=1,
+                        help="Linguagens executadas ao mesmo tempo, em namespaces isolados (padrão: 1)")
+    parser.add_argument("--log-dir", default=BASE_LOG_DIR, help="Diretório base dos logs")
+    parser.add_argument("--state-file", default=None,
+                        help="Arquivo de estado para retomada (padrão: <log-dir>/scheduler_state.json)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Busca adaptativa: sobe a concorrência e para/bissecta ao violar os limites")
+    parser.add_argument("--max-latency-ms", type=float, default=ADAPTIVE_MAX_LATENCY_MS,
+                        help=f"Latência média máxima na busca adaptativa (padrão: {ADAPTIVE_MAX_LATENCY_MS})")
+    parser.add_argument("--min-success-pct", type=float, default=ADAPTIVE_MIN_SUCCESS_PCT,
+                        help=f"Taxa de sucesso mínima na busca adaptativa (padrão: {ADAPTIVE_MIN_SUCCESS_PCT})")
+    parser.add_argument("--bisect-resolution", type=int, default=ADAPTIVE_BISECT_RESOLUTION,
+                        help=f"Resolução da bisseção em clientes; 0 desliga (padrão: {ADAPTIVE_BISECT_RESOLUTION})")
+    parser.add_argument("--batch", action="store_true",
+                        help="Executa os cenários de cada número de réplicas em um único pod (requer o client.py)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="kubectl",
+                        help="Backend de cluster ('fake' simula localmente, sem cluster)")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="tcp",
+                        help="Transporte do servidor e do cliente; tls e udp só existem na implementação Python")
+    parser.add_argument("--server-engine", choices=SERVER_ENGINES, default="asyncio",
+                        help="Modelo de concorrência do server.py; só existe na implementação Python")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="Liga o profiling.py no servidor e no cliente Python; os perfis ficam ao lado dos logs")
+    args = parser.parse_args()
+    if args.adaptive and args.batch:
+        parser.error("--adaptive decide cada cenário pelo resultado do anterior e não pode ser usado com --batch")
+    if args.batch and set(args.languages) - {"python"}:
+        parser.error("--batch só é suportado com -l python (os clientes Go e C++ ignoram SCENARIOS)")
+    if args.transport != "tcp" and set(args.languages) - {"python"}:
+        parser.error(f"--transport {args.transport} só é suportado com -l python")
+    if args.server_engine != "asyncio" and set(args.languages) - {"python"}:
+        parser.error(f"--server-engine {args.server_engine} só é suportado com -l python")
+    if args.profile and set(args.languages) - {"python"}:
+        parser.error("--profile só é suportado com -l python")
+    if args.server_engine != "asyncio" and args.transport != "tcp":
+        parser.error(f"--server-engine {args.server_engine} só suporta --transport tcp")
+
+    state = SchedulerState(args.state_file or os.path.join(args.log_dir, "scheduler_state.json"))
+    if state.count_done():
+        print(f"Retomando: {state.count_done()} cenário(s) já concluído(s) em {state.path}.")
+
+    scheduler = Scheduler(BACKENDS[args.backend](), state, args.languages, args.server_replicas,
+                          args.client_concurrency, args.messages_per_client, args.docker_user, args.log_dir,
+                          adaptive=AdaptiveLimits(args.max_latency_ms, args.min_success_pct, args.bisect_resolution)
+                          if args.adaptive else None, batch=args.batch, transport=args.transport,
+                          server_engine=args.server_engine, profile_mode=args.profile)
+    try:
+        scheduler.run(args.runs, args.parallel)
+    except KeyboardInterrupt:
+        print(f"\nInterrompido. O progresso está salvo em {state.path}; execute novamente para retomar.", file=sys.stderr)
+        sys.exit(130)
@@ -1,40 +1,395 @@
 # server.py
 import asyncio
 import os
+import sys
+import json
+import time
+import signal
+import socket
+import ssl
+import resource
+import tempfile
+import subprocess
+import selectors
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from profiling import ProfilingHooks
 
 PORT = int(os.environ.get("PORT", 8080))
 HOST = '0.0.0.0'
+# Transporte: 'tcp' (padrão), 'tls' (certificado autoassinado gerado na partida, se TLS_CERT_FILE/TLS_KEY_FILE
+# não forem dados) ou 'udp' (eco de datagramas)
+TRANSPORT = os.environ.get("TRANSPORT", "tcp").lower()
+TLS_CERT_FILE = os.environ.get("TLS_CERT_FILE")
+TLS_KEY_FILE = os.environ.get("TLS_KEY_FILE")
+# Modelo de concorrência: 'asyncio' (streams, padrão), 'selectors' (loop próprio com sockets não
+# bloqueantes) ou 'threads' (uma thread do pool por conexão). Os dois últimos só falam TCP.
+SERVER_ENGINE = os.environ.get("SERVER_ENGINE", "asyncio").lower()
+THREAD_POOL_SIZE = int(os.environ.get("THREAD_POOL_SIZE", 512))
+# Mesmo backlog padrão do asyncio.start_server
+LISTEN_BACKLOG = 100
+
+# Amostragem de recursos do processo: intervalo, tamanho do buffer circular e arquivo opcional de saída
+SAMPLE_INTERVAL_S = float(os.environ.get("SAMPLE_INTERVAL_S", 1.0))
+SAMPLE_BUFFER_SIZE = int(os.environ.get("SAMPLE_BUFFER_SIZE", 3600))
+SAMPLES_FILE = os.environ.get("SERVER_SAMPLES_FILE")
+
+class ResourceSampler:
+    """
+    Amostra periodicamente RSS, tempo de CPU, descritores abertos, conexões ativas e atraso
+    do loop de eventos em um buffer circular de tamanho fixo (um array de floats por coluna).
+    O buffer é despejado como uma linha JSON com 'type': 'server_samples' ao receber SIGUSR1 e
+    no encerramento. Os timestamps são epoch (time.time()), a mesma base dos registros do cliente.
+    """
+
+    FIELDS = ("timestamp", "rss_bytes", "cpu_user_s", "cpu_system_s", "open_fds", "active_connections", "loop_lag_ms")
+
+    def __init__(self, capacity=SAMPLE_BUFFER_SIZE, interval=SAMPLE_INTERVAL_S):
+        self.capacity = capacity
+        self.interval = interval
+        self.columns = {field: array('d', bytes(8 * capacity)) for field in self.FIELDS}
+        self.next_index = 0
+        self.count = 0
+        self.active_connections = 0
+        # Reentrante: no modelo 'selectors' o despejo por sinal pode interromper um record() na mesma thread
+        self.lock = threading.RLock()
+        self.page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def rss_bytes(self):
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * self.page_size
+        except OSError:
+            # Fora do Linux só há o pico de RSS (em KiB)
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    @staticmethod
+    def open_fds():
+        try:
+            return len(os.listdir('/proc/self/fd'))
+        except OSError:
+            return -1
+
+    def connection_opened(self):
+        with self.lock:
+            self.active_connections += 1
+
+    def connection_closed(self):
+        with self.lock:
+            self.active_connections -= 1
+
+    def record(self, loop_lag_ms):
+        times = os.times()
+        with self.lock:
+            values = (time.time(), self.rss_bytes(), times.user, times.system, self.open_fds(),
+                      self.active_connections, loop_lag_ms)
+            for field, value in zip(self.FIELDS, values):
+                self.columns[field][self.next_index] = value
+            self.next_index = (self.next_index + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def rows(self):
+        """Amostras em ordem cronológica."""
+        with self.lock:
+            start = (self.next_index - self.count) % self.capacity
+            indexes = [(start + i) % self.capacity for i in range(self.count)]
+            return [[self.columns[field][i] for field in self.FIELDS] for i in indexes]
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            before = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(max(loop.time() - before - self.interval, 0) * 1000)
+
+    def run_thread(self, stop):
+        """Amostragem em uma thread (modelo 'threads'); o atraso medido é o da espera, que reflete a disputa pelo GIL."""
+        while True:
+            before = time.monotonic()
+            if stop.wait(self.interval):
+                return
+            self.record(max(time.monotonic() - before - self.interval, 0) * 1000)
+
+    def dump(self, reason):
+        payload = json.dumps({
+            "type": "server_samples", "reason": reason, "transport": TRANSPORT, "engine": SERVER_ENGINE, "pod": socket.gethostname(), "pid": os.getpid(),
+            "interval_s": self.interval, "columns": list(self.FIELDS), "rows": self.rows(),
+        })
+        print(payload, flush=True)
+        if SAMPLES_FILE:
+            with open(SAMPLES_FILE, 'a') as f:
+                f.write(payload + "\n")
+
+sampler = ResourceSampler()
+# Profiling sob demanda (PROFILE_MODE ou PROFILE_SIGNAL); o perfil sai no encerramento, no fim da janela ou no segundo sinal
+profiling_hooks = ProfilingHooks("server", labels=lambda: {"engine": SERVER_ENGINE, "transport": TRANSPORT})
+
+def dump_on_shutdown():
+    sampler.dump("shutdown")
+    profiling_hooks.stop("shutdown")
+
+# --- Registro de eventos, comum a todos os modelos ---
+
+def log_accepted(addr):
+    sampler.connection_opened()
+    print(f"[*] Accepted connection from {addr[0]}:{addr[1]}")
+
+def log_received(addr, data):
+    message = data.decode('utf-8').strip()
+    print(f"[*] Received from {addr[0]}:{addr[1]}: {message}")
+
+def log_reset(addr):
+    print(f"[-] Client {addr[0]}:{addr[1]} forcibly closed connection.")
+
+def log_error(addr, e):
+    print(f"[-] Error handling client {addr[0]}:{addr[1]}: {e}")
+
+def log_disconnected(addr):
+    sampler.connection_closed()
+    print(f"[*] Client {addr[0]}:{addr[1]} disconnected")
+
+# --- Modelo 'asyncio' ---
 
 async def handle_client(reader, writer):
     addr = writer.get_extra_info('peername')
-    print(f"[*] Accepted connection from {addr[0]}:{addr[1]}")
+    log_accepted(addr)
     try:
         while True:
             data = await reader.read(1024)
             if not data:
                 break
-            message = data.decode('utf-8').strip()
-            print(f"[*] Received from {addr[0]}:{addr[1]}: {message}")
+            log_received(addr, data)
             writer.write(data) # Echo back the received data
             await writer.drain() # Ensure the data is sent
     except ConnectionResetError:
-        print(f"[-] Client {addr[0]}:{addr[1]} forcibly closed connection.")
+        log_reset(addr)
     except Exception as e:
-        print(f"[-] Error handling client {addr[0]}:{addr[1]}: {e}")
+        log_error(addr, e)
     finally:
-        print(f"[*] Client {addr[0]}:{addr[1]} disconnected")
+        log_disconnected(addr)
         writer.close()
         await writer.wait_closed() # Ensure the writer is closed
 
-async def main():
+class DatagramEchoProtocol(asyncio.DatagramProtocol):
+    """Eco UDP: devolve cada datagrama ao remetente. Sem conexões, só conta os datagramas."""
+
+    def __init__(self):
+        self.transport = None
+        self.datagrams = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.datagrams += 1
+        self.transport.sendto(data, addr)
+
+def tls_context():
+    """Contexto TLS do servidor; sem certificado configurado, gera um autoassinado com o openssl."""
+    cert_file, key_file = TLS_CERT_FILE, TLS_KEY_FILE
+    if not (cert_file and key_file):
+        cert_dir = tempfile.mkdtemp(prefix="server-tls-")
+        cert_file, key_file = os.path.join(cert_dir, "cert.pem"), os.path.join(cert_dir, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=server-service", "-keyout", key_file, "-out", cert_file],
+                       check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_file, key_file)
+    # Tickets de sessão ficam habilitados (padrão do OpenSSL), permitindo a retomada pelos clientes
+    return context
+
+async def start_transport():
+    """Inicia o servidor no transporte configurado e retorna (servidor, endereços)."""
+    loop = asyncio.get_running_loop()
+    if TRANSPORT == "udp":
+        transport, _ = await loop.create_datagram_endpoint(DatagramEchoProtocol, local_addr=(HOST, PORT))
+        return transport, str(transport.get_extra_info('sockname'))
+    if TRANSPORT not in ("tcp", "tls"):
+        raise ValueError(f"TRANSPORT inválido: {TRANSPORT!r} (use tcp, tls ou udp)")
     server = await asyncio.start_server(
-        handle_client, HOST, PORT)
+        handle_client, HOST, PORT, ssl=tls_context() if TRANSPORT == "tls" else None)
+    return server, ', '.join(str(sock.getsockname()) for sock in server.sockets)
 
-    addrs = ', '.join(str(sock.getsockname()) for sock in server.sockets)
-    print(f"[*] Serving on {addrs}")
+async def main():
+    server, addrs = await start_transport()
+    print(f"[*] Serving {TRANSPORT} on {addrs} (asyncio engine)")
 
-    async with server:
-        await server.serve_forever()
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+    sampling = asyncio.create_task(sampler.run())
+    # SIGUSR1 despeja as amostras sob demanda; SIGTERM (enviado pelo Kubernetes) encerra o servidor
+    loop.add_signal_handler(signal.SIGUSR1, sampler.dump, "request")
+    loop.add_signal_handler(signal.SIGTERM, main_task.cancel)
+
+    try:
+        if TRANSPORT == "udp":
+            await loop.create_future()
+        else:
+            async with server:
+                await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        server.close()
+        sampling.cancel()
+        dump_on_shutdown()
+
+# --- Modelos bloqueantes ('selectors' e 'threads') ---
+
+class ShutdownRequested(BaseException):
+    """
+    Levantada pelo tratador de SIGTERM para interromper o laço principal. Deriva de BaseException,
+    como KeyboardInterrupt, para não ser engolida pelos `except Exception` do tratamento de conexões.
+    """
+
+def install_signal_handlers():
+    """Equivalente, fora do asyncio, aos tratadores de SIGUSR1/SIGTERM do main()."""
+    def shutdown(signum, frame):
+        raise ShutdownRequested()
+    signal.signal(signal.SIGUSR1, lambda signum, frame: sampler.dump("request"))
+    signal.signal(signal.SIGTERM, shutdown)
+
+def listening_socket():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((HOST, PORT))
+    listener.listen(LISTEN_BACKLOG)
+    return listener
+
+class SelectorConnection:
+    """Estado de uma conexão no modelo 'selectors': endereço e bytes ainda não devolvidos."""
+
+    __slots__ = ("addr", "pending", "writing")
+
+    def __init__(self, addr):
+        self.addr = addr
+        self.pending = bytearray()
+        self.writing = False
+
+def close_selector_connection(selector, conn, state):
+    selector.unregister(conn)
+    conn.close()
+    log_disconnected(state.addr)
+
+def accept_connections(selector, listener):
+    """Aceita todas as conexões pendentes no socket de escuta."""
+    while True:
+        try:
+            conn, addr = listener.accept()
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        selector.register(conn, selectors.EVENT_READ, SelectorConnection(addr))
+        log_accepted(addr)
+
+def service_connection(selector, conn, state, mask):
+    try:
+        if mask & selectors.EVENT_READ:
+            data = conn.recv(1024)
+            if not data:
+                close_selector_connection(selector, conn, state)
+                return
+            log_received(state.addr, data)
+            state.pending += data
+        if state.pending:
+            sent = conn.send(state.pending)
+            del state.pending[:sent]
+        # Só observa a escrita enquanto houver bytes a devolver, como o drain() do asyncio
+        writing = bool(state.pending)
+        if writing != state.writing:
+            state.writing = writing
+            selector.modify(conn, selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0), state)
+    except BlockingIOError:
+        pass
+    except ConnectionResetError:
+        log_reset(state.addr)
+        close_selector_connection(selector, conn, state)
+    except Exception as e:
+        log_error(state.addr, e)
+        close_selector_connection(selector, conn, state)
+
+def run_selectors():
+    """Loop de eventos próprio sobre selectors; as amostras saem do mesmo loop, com o atraso do timer."""
+    listener = listening_socket()
+    listener.setblocking(False)
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ)
+    print(f"[*] Serving tcp on {listener.getsockname()} (selectors engine)")
+    install_signal_handlers()
+
+    next_sample = time.monotonic() + sampler.interval
+    try:
+        while True:
+            for key, mask in selector.select(timeout=max(next_sample - time.monotonic(), 0)):
+                if key.fileobj is listener:
+                    accept_connections(selector, listener)
+                else:
+                    service_connection(selector, key.fileobj, key.data, mask)
+            now = time.monotonic()
+            if now >= next_sample:
+                sampler.record((now - next_sample) * 1000)
+                next_sample = now + sampler.interval
+    except ShutdownRequested:
+        pass
+    finally:
+        selector.close()
+        listener.close()
+        dump_on_shutdown()
+
+def serve_connection_blocking(conn, addr):
+    log_accepted(addr)
+    try:
+        with conn:
+            while True:
+                data = conn.recv(1024)
+                if not data:
+                    break
+                log_received(addr, data)
+                conn.sendall(data)
+    except ConnectionResetError:
+        log_reset(addr)
+    except Exception as e:
+        log_error(addr, e)
+    finally:
+        log_disconnected(addr)
+
+def run_threads():
+    """Uma thread do pool por conexão, com E/S bloqueante; além de THREAD_POOL_SIZE, as conexões esperam na fila."""
+    listener = listening_socket()
+    print(f"[*] Serving tcp on {listener.getsockname()} (threads engine, pool of {THREAD_POOL_SIZE})")
+    install_signal_handlers()
+    stop = threading.Event()
+    threading.Thread(target=sampler.run_thread, args=(stop,), name="sampler", daemon=True).start()
+    pool = ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="conn")
+    try:
+        while True:
+            conn, addr = listener.accept()
+            pool.submit(serve_connection_blocking, conn, addr)
+    except ShutdownRequested:
+        pass
+    finally:
+        stop.set()
+        listener.close()
+        dump_on_shutdown()
+        # As threads do pool seguram conexões abertas e impediriam a saída do interpretador
+        sys.stdout.flush()
+        os._exit(0)
+
+ENGINES = {"selectors": run_selectors, "threads": run_threads}
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if SERVER_ENGINE != "asyncio" and SERVER_ENGINE not in ENGINES:
+        sys.exit(f"SERVER_ENGINE inválido: {SERVER_ENGINE!r} (use asyncio, selectors ou threads)")
+    if SERVER_ENGINE != "asyncio" and TRANSPORT != "tcp":
+        sys.exit(f"O modelo {SERVER_ENGINE!r} só suporta TRANSPORT=tcp")
+    profiling_hooks.install_signal_handlers()
+    profiling_hooks.start_from_env()
+    try:
+        if SERVER_ENGINE == "asyncio":
+            asyncio.run(main())
+        else:
+            ENGINES[SERVER_ENGINE]()
+    except KeyboardInterrupt:
+        sys.exit(0)